@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""Shared helpers for the storage benchmarks.
+
+Each benchmark runs from the repository root as a module, e.g.
+    python3 -m benchmarks.reload_datetime 1000000
+and works inside a fresh temporary directory, so importing models never
+reads or writes the file.json of the working tree.
+"""
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+
+def workdir():
+    """Moves into a fresh temporary directory and returns its path."""
+    path = tempfile.mkdtemp(prefix="hbnb-bench-")
+    os.chdir(path)
+    return path
+
+
+def record(classname, rng):
+    """Returns a to_dict()-style dictionary for a random classname object."""
+    created = datetime(2024, 1, 1) + timedelta(seconds=rng.randrange(10 ** 8),
+                                               microseconds=rng.randrange(10 ** 6))
+    value = {
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "created_at": created.isoformat(),
+        "updated_at": (created + timedelta(seconds=rng.randrange(10 ** 6))).isoformat(),
+        "__class__": classname
+    }
+    if classname == "User":
+        value.update(email="user{}@mail.com".format(rng.randrange(10 ** 6)),
+                     password="secret", first_name="Betty", last_name="Holberton")
+    elif classname in ("State", "Amenity"):
+        value.update(name="name{}".format(rng.randrange(10 ** 4)))
+    elif classname == "City":
+        value.update(state_id=str(uuid.uuid4()), name="city")
+    elif classname == "Place":
+        value.update(city_id=str(uuid.uuid4()), user_id=str(uuid.uuid4()),
+                     name="place", description="A place to stay",
+                     number_rooms=rng.randrange(1, 8),
+                     number_bathrooms=rng.randrange(1, 4),
+                     max_guest=rng.randrange(1, 12),
+                     price_by_night=rng.randrange(20, 500),
+                     latitude=rng.uniform(-90, 90),
+                     longitude=rng.uniform(-180, 180), amenity_ids=[])
+    elif classname == "Review":
+        value.update(place_id=str(uuid.uuid4()), user_id=str(uuid.uuid4()),
+                     text="Great stay")
+    return value
+
+
+def generate(path, count, seed=0):
+    """Writes a file.json of count objects of mixed classes to path."""
+    rng = random.Random(seed)
+    names = ["User", "State", "City", "Amenity", "Place", "Place", "Review"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{\n")
+        for i in range(count):
+            value = record(names[i % len(names)], rng)
+            key = "{}.{}".format(value["__class__"], value["id"])
+            tail = ",\n" if i < count - 1 else "\n"
+            f.write("{}: {}{}".format(json.dumps(key), json.dumps(value), tail))
+        f.write("}")
+
+
+def timed(label, func, *args):
+    """Runs func(*args), prints how long it took and returns the seconds."""
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    print("{:<40} {:>9.3f}s".format(label, elapsed))
+    return elapsed
@@ -0,0 +1,39 @@
+#!/usr/bin/python3
+"""Compares syncing a consumer from the changelog with reparsing file.json.
+
+Usage: python3 -m benchmarks.change_feed [count]
+"""
+import json
+import sys
+from benchmarks import generate, timed, workdir
+
+
+def main(count, changed=100):
+    """Generates count objects, changes a few and syncs a consumer both ways."""
+    workdir()
+    from models.engine.file_storage import FileStorage
+
+    generate("file.json", count)
+    print("{} objects, {} changed".format(count, changed))
+    results = {}
+    for changelog in (False, True):
+        storage = FileStorage(durability="none", changelog=changelog)
+        storage.reload()
+        storage.save()
+        for place in list(storage.all("Place").values())[:changed]:
+            place.name = "Changed"
+            storage.touch(place, "name")
+        label = "save(), changelog={}".format(changelog)
+        results[changelog] = timed(label, storage.save)
+    print("{:<40} {:>9.3f}s".format("changelog overhead", results[True] - results[False]))
+
+    def reparse():
+        with open("file.json", "r", encoding="utf-8") as f:
+            json.load(f)
+    scan = timed("consumer reparses file.json", reparse)
+    feed = timed("consumer reads events(since)", storage.events, 0)
+    print("{:<40} {:>9.0f}x".format("sync speedup", scan / feed))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+"""Compares time-range queries on the sorted updated_at lists with a scan.
+
+Usage: python3 -m benchmarks.changes [count]
+"""
+import sys
+from datetime import timedelta
+from benchmarks import generate, timed, workdir
+
+
+def main(count):
+    """Generates count objects and asks for the latest changes both ways."""
+    workdir()
+    from models import storage
+
+    generate("file.json", count)
+    storage.reload()
+    print("{} objects".format(count))
+    latest = max(obj.updated_at for obj in storage.all().values())
+    since = latest - timedelta(hours=1)
+    scan = timed("scan and sort x 10", lambda: [sorted(
+        (obj for obj in storage.all().values() if obj.updated_at >= since),
+        key=lambda obj: obj.updated_at) for _ in range(10)])
+    timed("first between() (builds)", storage.between, None, "updated_at", since)
+    found = []
+    query = timed("between() x 1000", lambda: [
+        found.append(len(storage.between(None, "updated_at", since)))
+        for _ in range(1000)])
+    print("{:<40} {:>9}".format("objects changed in the last hour", found[0]))
+    print("{:<40} {:>9.0f}x".format("per query speedup", (scan / 10) / (query / 1000)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+"""Compares printing one list with streaming do_all: peak memory and latency.
+
+Usage: python3 -m benchmarks.console_all [count]
+"""
+import io
+import sys
+import time
+import tracemalloc
+from benchmarks import generate, workdir
+
+
+class Sink(io.TextIOBase):
+    """Text stream discarding its output but timing the first write."""
+
+    def __init__(self):
+        """Starts the clock."""
+        self.start = time.perf_counter()
+        self.first = None
+
+    def write(self, text):
+        """Records when the first text arrives."""
+        if self.first is None:
+            self.first = time.perf_counter() - self.start
+        return len(text)
+
+
+def measure(label, func):
+    """Runs func with stdout sent to a Sink and prints its costs."""
+    stdout, sys.stdout = sys.stdout, Sink()
+    tracemalloc.start()
+    try:
+        func()
+        sink = sys.stdout
+        total = time.perf_counter() - sink.start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        sys.stdout = stdout
+    print("{:<40} first output {:>7.3f}s, total {:>7.3f}s, peak {:>8.1f}MB".format(
+        label, sink.first, total, peak / 1e6))
+
+
+def main(count):
+    """Generates count objects and prints them both ways."""
+    workdir()
+    from console import HBNBCommand
+    from models import storage
+
+    generate("file.json", count)
+    storage.reload()
+    print("{} objects".format(count))
+    measure("print([str(obj) ...])",
+            lambda: print([str(obj) for obj in storage.all().values()]))
+    measure("all (streaming)", lambda: HBNBCommand().onecmd("all"))
+    measure("all format=ndjson", lambda: HBNBCommand().onecmd("all format=ndjson"))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+"""Compares opening a mapped snapshot with a full FileStorage reload().
+
+Usage: python3 -m benchmarks.mapped_open [count]
+"""
+import sys
+from benchmarks import generate, timed, workdir
+
+
+def main(count):
+    """Generates count objects and times opening them and reading a few."""
+    workdir()
+    from models.engine import snapshot
+    from models.engine.file_storage import FileStorage
+    from models.engine.mapped_storage import MappedStorage
+
+    generate("file.json", count)
+    snapshot.convert("file.json", "file.map")
+    print("{} objects".format(count))
+    storage = FileStorage(path="file.json")
+    load = timed("FileStorage reload()", storage.reload)
+    ids = [key.split(".", 1) for key in list(storage.all())[:1000]]
+    FileStorage._FileStorage__objects = {}
+    mapped = MappedStorage("file.map")
+    start = timed("MappedStorage reload()", mapped.reload)
+    read = timed("MappedStorage get() x {}".format(len(ids)),
+                 lambda: [mapped.get(name, id) for name, id in ids])
+    mapped.close()
+    print("{:<40} {:>9.0f}x".format("open speedup", load / start))
+    print("{:<40} {:>9.0f}x".format("open + reads speedup", load / (start + read)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
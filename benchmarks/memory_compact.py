@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+"""Reports the memory held per object after reload(), with and without
+the compact (__slots__) model classes.
+
+Usage: python3 -m benchmarks.memory_compact [count]
+"""
+import gc
+import sys
+import tracemalloc
+from benchmarks import generate, workdir
+
+
+def measure(compact):
+    """Reloads file.json and returns the bytes held per object, by class."""
+    from models.engine.file_storage import FileStorage
+
+    FileStorage._FileStorage__objects = {}
+    gc.collect()
+    tracemalloc.start()
+    storage = FileStorage(compact=compact)
+    storage.reload()
+    total = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    sizes = {}
+    for name, cls in storage.classes().items():
+        objs = list(storage.all(name).values())
+        if not objs:
+            continue
+        values = [obj.to_dict() for obj in objs[:1000]]
+        gc.collect()
+        tracemalloc.start()
+        instances = [cls(**value) for value in values]
+        sizes[name] = (tracemalloc.get_traced_memory()[0] - sys.getsizeof(instances)) / len(instances)
+        tracemalloc.stop()
+        del instances
+    return total / storage.count(), sizes
+
+
+def main(count):
+    """Generates count objects and compares both representations."""
+    workdir()
+    import models  # noqa: F401  loads the empty store before generating
+
+    generate("file.json", count)
+    plain, plain_sizes = measure(False)
+    compact, compact_sizes = measure(True)
+    print("{} objects".format(count))
+    print("{:<28} {:>10} {:>10}".format("bytes per object", "__dict__", "__slots__"))
+    print("{:<28} {:>10.0f} {:>10.0f}".format("whole store after reload", plain, compact))
+    for name in plain_sizes:
+        print("{:<28} {:>10.0f} {:>10.0f}".format(
+            name + " instance + values", plain_sizes[name], compact_sizes[name]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+"""Compares walking a class page by page with sorting all(cls) for each page.
+
+Usage: python3 -m benchmarks.page [count]
+"""
+import sys
+from benchmarks import generate, timed, workdir
+
+
+def walk(page, pages, limit=20, order="id"):
+    """Fetches pages consecutive pages of limit objects through page()."""
+    after = None
+    for _ in range(pages):
+        objects = page("Place", limit, after, order)
+        after = objects[-1].id
+
+
+def main(count):
+    """Generates count objects and pages through their places both ways."""
+    workdir()
+    from models import storage
+    from models.engine.base_storage import BaseStorage
+
+    generate("file.json", count)
+    storage.reload()
+    print("{} objects".format(count))
+    scan = lambda *args: BaseStorage.page(storage, *args)
+    for order in BaseStorage.ORDERS:
+        sort = timed("sorted scan x 10 by {}".format(order),
+                     walk, scan, 10, 20, order)
+        build = timed("first page() by {}".format(order),
+                      storage.page, "Place", 20, None, order)
+        pages = timed("page() x 1000 by {}".format(order),
+                      walk, storage.page, 1000, 20, order)
+        print("{:<40} {:>9.0f}x".format("per page speedup",
+                                        (sort / 10) / (pages / 1000)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""Times reload() with an increasing number of worker processes.
+
+Usage: python3 -m benchmarks.parallel_reload [count]
+
+Runs 1, 2, 4, ... workers up to the number of CPUs (at least 2), so the
+scaling only shows on a machine with several cores.
+"""
+import os
+import sys
+from benchmarks import generate, timed, workdir
+
+
+def main(count):
+    """Generates count objects and times reload() for each worker count."""
+    workdir()
+    from models.engine.file_storage import FileStorage
+
+    generate("file.json", count)
+    print("{} objects, {} CPUs".format(count, os.cpu_count()))
+    FileStorage(durability="none").reload()
+    FileStorage(durability="none").save()
+    FileStorage._FileStorage__objects = {}
+    workers, results = 1, {}
+    while workers == 1 or workers <= max(2, os.cpu_count()):
+        storage = FileStorage(workers=workers)
+        results[workers] = timed("reload() workers={}".format(workers), storage.reload)
+        FileStorage._FileStorage__objects = {}
+        workers *= 2
+    for workers, seconds in results.items():
+        print("{:<40} {:>9.2f}x".format("speedup workers={}".format(workers),
+                                        results[1] / seconds))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+"""Compares reload() using strptime() with the fromisoformat() fast path.
+
+Usage: python3 -m benchmarks.reload_datetime [count]
+"""
+import json
+import sys
+from datetime import datetime
+from benchmarks import generate, timed, workdir
+
+
+def strptime_parse(value):
+    """Decodes a timestamp the way BaseModel.__init__ used to."""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f")
+
+
+def main(count):
+    """Generates count objects and times both datetime decoders."""
+    workdir()
+    from models import base_model
+    from models.engine.file_storage import FileStorage
+
+    generate("file.json", count)
+    with open("file.json", "r", encoding="utf-8") as f:
+        stamps = [v["created_at"] for v in json.load(f).values()] * 2
+    print("{} objects, {} timestamps".format(count, len(stamps)))
+
+    fast_parse = base_model.parse_datetime
+    fast = timed("parse_datetime() only", lambda: [fast_parse(s) for s in stamps])
+    slow = timed("strptime() only", lambda: [strptime_parse(s) for s in stamps])
+    print("{:<40} {:>9.2f}x".format("decode speedup", slow / fast))
+
+    storage = FileStorage()
+    fast = timed("reload() with parse_datetime()", storage.reload)
+    FileStorage._FileStorage__objects = {}
+    base_model.parse_datetime = strptime_parse
+    slow = timed("reload() with strptime()", storage.reload)
+    base_model.parse_datetime = fast_parse
+    print("{:<40} {:>9.2f}x".format("reload speedup", slow / fast))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
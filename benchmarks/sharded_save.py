@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""Compares save() after a one-object change, with and without class shards.
+
+Usage: python3 -m benchmarks.sharded_save [count]
+"""
+import sys
+from benchmarks import generate, timed, workdir
+
+
+def main(count):
+    """Generates count objects and times a save after changing one Review."""
+    workdir()
+    from models.engine.file_storage import FileStorage
+
+    generate("file.json", count)
+    print("{} objects".format(count))
+    results = {}
+    for shards in (None, "class"):
+        storage = FileStorage(durability="none", shards=shards)
+        if shards is None:
+            storage.reload()
+        else:
+            FileStorage(durability="none").reload()
+            storage.save()
+            storage.reload()
+        review = next(iter(storage.all("Review").values()))
+        review.text = "Changed"
+        storage.touch(review)
+        label = "save() one Review, shards={}".format(shards)
+        results[shards] = timed(label, storage.save)
+        FileStorage._FileStorage__objects = {}
+    print("{:<40} {:>9.2f}x".format("save speedup", results[None] / results["class"]))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
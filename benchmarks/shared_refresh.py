@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""Times picking up another process's save in shared mode.
+
+Usage: python3 -m benchmarks.shared_refresh [count]
+"""
+import json
+import sys
+from benchmarks import generate, timed, workdir
+
+
+def main(count, changed=10):
+    """Generates count objects, journals a few changes as another process
+    would and times refresh() against a full reload().
+    """
+    workdir()
+    from models.engine.file_storage import FileStorage
+
+    generate("file.json", count)
+    print("{} objects, {} changed by another process".format(count, changed))
+    storage = FileStorage(durability="none", journal=True, shared=True)
+    storage.reload()
+    timed("refresh() x 1000, nothing changed",
+          lambda: [storage.refresh() for _ in range(1000)])
+    places = list(storage.all("Place").values())[:changed]
+    with open("file.json.journal", "a", encoding="utf-8") as f:
+        for place in places:
+            value = dict(place.to_dict(), name="Changed")
+            f.write(json.dumps({"key": "Place." + place.id, "value": value}) + "\n")
+    merge = timed("refresh() of the journal tail", storage.refresh)
+    load = timed("reload()", storage.reload)
+    print("{:<40} {:>9.0f}x".format("refresh speedup", load / merge))
+    for shared in (False, True):
+        storage = FileStorage(durability="none", journal=True, shared=shared,
+                              compact_every=10 ** 6)
+        storage.reload()
+        place = storage.get("Place", places[0].id)
+
+        def save():
+            for _ in range(500):
+                place.name = "Saved"
+                storage.touch(place, "name")
+                storage.save()
+        timed("journal save() x 500, shared={}".format(shared), save)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
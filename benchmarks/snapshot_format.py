@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+"""Compares JSON files with binary snapshots: size, save() and reload().
+
+Usage: python3 -m benchmarks.snapshot_format [count]
+"""
+import os
+import sys
+from benchmarks import generate, timed, workdir
+
+
+def main(count):
+    """Generates count objects and times both formats."""
+    workdir()
+    from models.engine import snapshot
+    from models.engine.file_storage import FileStorage
+
+    generate("file.json", count)
+    snapshot.convert("file.json", "file.bin")
+    print("{} objects".format(count))
+    results = {}
+    for path in ("file.json", "file.bin"):
+        storage = FileStorage(path=path, durability="none")
+        load = timed("reload() " + path, storage.reload)
+        save = timed("save() " + path + ", every object encoded", storage.save)
+        results[path] = (os.path.getsize(path), load, save)
+        FileStorage._FileStorage__objects = {}
+    (json_size, json_load, json_save), (bin_size, bin_load, bin_save) = results.values()
+    print("{:<40} {:>9.1f}MB {:>9.1f}MB".format("size json / bin", json_size / 1e6, bin_size / 1e6))
+    print("{:<40} {:>9.2f}x".format("reload speedup", json_load / bin_load))
+    print("{:<40} {:>9.2f}x".format("save speedup", json_save / bin_save))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -2,16 +2,47 @@
 """This module is the entry point for the command interpreter."""
 
 import cmd
-from models.base_model import BaseModel
+from datetime import datetime, timedelta
+from models.base_model import BaseModel, parse_datetime
 from models import storage
+from models.engine.coercion import literal
+import os
 import re
 import json
+import sys
+import threading
 
 
 class HBNBCommand(cmd.Cmd):
     """Defines the command interpreter class."""
 
     prompt = "(hbnb) "
+    CHUNK = 100
+    LOCK = threading.RLock()
+
+    def precmd(self, line):
+        """Picks up the objects other processes saved before each command."""
+        with HBNBCommand.LOCK:
+            storage.refresh()
+        return line
+
+    def onecmd(self, line):
+        """Runs a command while holding LOCK against flush_every()."""
+        with HBNBCommand.LOCK:
+            return super().onecmd(line)
+
+    @staticmethod
+    def flush_every(interval, stopped):
+        """Writes out deferred saves every interval seconds until stopped
+        is set, so that they wait no longer while the console sits idle.
+
+        Args:
+            - interval: number of seconds between two flushes
+            - stopped: threading.Event ending the loop
+        """
+        while not stopped.wait(interval):
+            with HBNBCommand.LOCK:
+                storage.flush()
 
     def default(self, line):
         """Handle unmatched commands."""
@@ -57,24 +88,31 @@ class HBNBCommand(cmd.Cmd):
         elif not uid:
             print("** instance id missing **")
         else:
-            key = f"{classname}.{uid}"
-            if key not in storage.all():
+            obj = storage.get(classname, uid)
+            if obj is None:
                 print("** no instance found **")
             else:
-                attributes = storage.attributes()[classname]
-                for attribute, value in d.items():
-                    if attribute in attributes:
-                        value = attributes[attribute](value)
-                    setattr(storage.all()[key], attribute, value)
-                storage.all()[key].save()
+                try:
+                    d = storage.coercer(classname).convert(d)
+                except ValueError as error:
+                    print("** {} **".format(error))
+                    return
+                try:
+                    for attribute, value in d.items():
+                        setattr(obj, attribute, value)
+                    obj.save()
+                except PermissionError as error:
+                    print("** {} **".format(error))
 
     def do_EOF(self, line):
         """Handle the End Of File character."""
         print()
+        storage.close()
         return True
 
     def do_quit(self, line):
         """Exit the program."""
+        storage.close()
         return True
 
     def emptyline(self):
@@ -88,8 +126,12 @@ class HBNBCommand(cmd.Cmd):
         elif line not in storage.classes():
             print("** class doesn't exist **")
         else:
-            instance = storage.classes()[line]()
-            instance.save()
+            try:
+                instance = storage.classes()[line]()
+                instance.save()
+            except PermissionError as error:
+                print("** {} **".format(error))
+                return
             print(instance.id)
 
     def do_show(self, line):
@@ -103,11 +145,11 @@ class HBNBCommand(cmd.Cmd):
             elif len(words) < 2:
                 print("** instance id missing **")
             else:
-                key = f"{words[0]}.{words[1]}"
-                if key not in storage.all():
+                obj = storage.get(words[0], words[1])
+                if obj is None:
                     print("** no instance found **")
                 else:
-                    print(storage.all()[key])
+                    print(obj)
 
     def do_destroy(self, line):
         """Delete an instance by class name and id."""
@@ -120,25 +162,211 @@ class HBNBCommand(cmd.Cmd):
             elif len(words) < 2:
                 print("** instance id missing **")
             else:
-                key = f"{words[0]}.{words[1]}"
-                if key not in storage.all():
+                obj = storage.get(words[0], words[1])
+                if obj is None:
                     print("** no instance found **")
                 else:
-                    del storage.all()[key]
-                    storage.save()
+                    try:
+                        storage.delete(obj)
+                        storage.save()
+                    except PermissionError as error:
+                        print("** {} **".format(error))
 
     def do_all(self, line):
-        """Print all instances, optionally filtered by class."""
-        if line:
-            words = line.split()
-            if words[0] not in storage.classes():
+        """Print all instances, optionally filtered by class.
+
+        Usage: all [<class>] [format=ndjson] [limit=<n>] [after=<id>] [order=<attribute>]
+        or <class>.all(limit=<n>, after=<id>)
+        """
+        words = line.split(None, 1)
+        classname = None
+        if words and "=" not in words[0]:
+            classname = words.pop(0)
+            if classname not in storage.classes():
                 print("** class doesn't exist **")
-            else:
-                instances = [str(obj) for obj in storage.all().values() if type(obj).__name__ == words[0]]
-                print(instances)
+                return
+        options = self.parse_options(" ".join(words),
+                                     ("format", "limit", "after", "order"))
+        if options is None:
+            return
+        fmt = options.get("format", "list")
+        if fmt not in ("list", "ndjson"):
+            print("** unknown format: {} **".format(fmt))
+            return
+        if not ({"limit", "after", "order"} & set(options)):
+            self.write_objects(storage.all(classname).values(), fmt == "ndjson")
+            return
+        limit = options.get("limit")
+        if limit is not None:
+            if not limit.isdigit():
+                print("** limit must be a non-negative integer **")
+                return
+            limit = int(limit)
+        order = options.get("order", "id")
+        if not classname:
+            print("** class name missing **")
+        elif order not in storage.ORDERS:
+            print("** unknown order: {} **".format(order))
         else:
-            instances = [str(obj) for obj in storage.all().values()]
-            print(instances)
+            try:
+                objs = storage.page(classname, limit, options.get("after"), order)
+            except KeyError:
+                print("** no instance found **")
+                return
+            self.write_objects(objs, fmt == "ndjson")
+
+    @staticmethod
+    def parse_options(text, names):
+        """Returns the <name>=<value> options written in text.
+
+        Prints an error and returns None if text holds anything else.
+        """
+        options, position = {}, 0
+        rex = re.compile(r'\s*(\w+)=("[^"]*"|[^,\s]+)\s*,?')
+        while position < len(text):
+            match = rex.match(text, position)
+            if not match or match.group(1) not in names:
+                print("** invalid option: {} **".format(text[position:].strip()))
+                return None
+            name, value = match.groups()
+            options[name] = value.strip('"')
+            position = match.end()
+        return options
+
+    @staticmethod
+    def write_objects(objs, ndjson=False):
+        """Writes instances to stdout one by one, as they are formatted.
+
+        The default output is the list of their strings exactly as print()
+        shows it; with ndjson, each instance is a line of to_dict() JSON.
+        Instances are written in chunks of CHUNK to save on write calls.
+        """
+        chunk = []
+        if ndjson:
+            for obj in objs:
+                chunk.append(json.dumps(obj.to_dict(), default=str) + "\n")
+                if len(chunk) == HBNBCommand.CHUNK:
+                    sys.stdout.write("".join(chunk))
+                    chunk = []
+            sys.stdout.write("".join(chunk))
+            return
+        separator = "["
+        for obj in objs:
+            chunk.append(separator + repr(str(obj)))
+            separator = ", "
+            if len(chunk) == HBNBCommand.CHUNK:
+                sys.stdout.write("".join(chunk))
+                chunk = []
+        chunk.append("[]\n" if separator == "[" else "]\n")
+        sys.stdout.write("".join(chunk))
+
+    def do_where(self, line):
+        """Print the instances of a class meeting every condition.
+
+        Usage: where <class> <attribute><operator><value> ... [limit=<n>] [offset=<n>]
+        or <class>.where(<attribute><operator><value>, ..., limit=<n>)
+        """
+        words = line.split(None, 1)
+        if not words:
+            print("** class name missing **")
+            return
+        classname = words[0]
+        if classname not in storage.classes():
+            print("** class doesn't exist **")
+            return
+        rest = words[1] if len(words) > 1 else ""
+        rex = re.compile(r'\s*(\w+)\s*(==|!=|<=|>=|<|>|=)\s*("[^"]*"|[^,\s]+)\s*,?')
+        conditions, limit, offset, position = [], None, 0, 0
+        coerce = storage.coercer(classname)
+        while position < len(rest):
+            match = rex.match(rest, position)
+            if not match:
+                print("** invalid condition: {} **".format(rest[position:].strip()))
+                return
+            attribute, op, value = match.groups()
+            position = match.end()
+            if len(value) > 1 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+            elif attribute not in coerce:
+                value = literal(value)
+            if op == "=":
+                op = "=="
+            if attribute in ("limit", "offset") and op == "==":
+                if not isinstance(value, int) or value < 0:
+                    print("** {} must be a non-negative integer **".format(attribute))
+                    return
+                if attribute == "limit":
+                    limit = value
+                else:
+                    offset = value
+                continue
+            try:
+                conditions.append((attribute, op, coerce(attribute, value)))
+            except ValueError as error:
+                print("** {} **".format(error))
+                return
+        objs = storage.where(classname, conditions, limit=limit, offset=offset)
+        self.write_objects(objs)
+
+    def do_changes(self, line):
+        """Print the instances changed in a time range, oldest first.
+
+        Usage: changes [<class>] [since=<time>] [until=<time>] [field=created_at] [limit=<n>] [format=ndjson]
+        or <class>.changes(since=<time>, until=<time>)
+        A <time> is an ISO 8601 datetime or a duration before now: -90s, -15m, -1h, -7d.
+        """
+        words = line.split(None, 1)
+        classname = None
+        if words and "=" not in words[0]:
+            classname = words.pop(0)
+            if classname not in storage.classes():
+                print("** class doesn't exist **")
+                return
+        options = self.parse_options(" ".join(words),
+                                     ("since", "until", "field", "limit", "format"))
+        if options is None:
+            return
+        fmt = options.get("format", "list")
+        field = options.get("field", "updated_at")
+        limit = options.get("limit")
+        if fmt not in ("list", "ndjson"):
+            print("** unknown format: {} **".format(fmt))
+            return
+        if field not in storage.TIMES:
+            print("** unknown field: {} **".format(field))
+            return
+        if limit is not None:
+            if not limit.isdigit():
+                print("** limit must be a non-negative integer **")
+                return
+            limit = int(limit)
+        bounds = []
+        for name in ("since", "until"):
+            try:
+                bounds.append(self.parse_time(options.get(name)))
+            except ValueError:
+                print("** invalid time: {} **".format(options[name]))
+                return
+        objs = storage.between(classname, field, *bounds)
+        self.write_objects(objs[:limit], fmt == "ndjson")
+
+    @staticmethod
+    def parse_time(text):
+        """Returns the datetime written in text, or None if text is None.
+
+        Raises ValueError if text is neither an ISO 8601 datetime nor a
+        duration before now such as -15m.
+        """
+        if text is None:
+            return None
+        match = re.match(r"^-(\d+)([smhd])$", text)
+        if not match:
+            value = parse_datetime(text)
+            if value.tzinfo is not None:
+                value = value.astimezone().replace(tzinfo=None)
+            return value
+        units = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+        return datetime.now() - timedelta(**{units[match.group(2)]: int(match.group(1))})
 
     def do_count(self, line):
         """Count the instances of a specified class."""
@@ -148,8 +376,7 @@ class HBNBCommand(cmd.Cmd):
         elif words[0] not in storage.classes():
             print("** class doesn't exist **")
         else:
-            matches = [key for key in storage.all() if key.startswith(f"{words[0]}.")]
-            print(len(matches))
+            print(storage.count(words[0]))
 
     def do_update(self, line):
         """Update an instance's attribute by class name and id."""
@@ -157,7 +384,7 @@ class HBNBCommand(cmd.Cmd):
             print("** class name missing **")
             return
         
-        rex = r'^(\S+)(?:\s(\S+)(?:\s(\S+)(?:\s((?:"[^"]*")|(?:(\S)+)))?)?)?'
+        rex = r'^(\S+)(?:\s(\S+)(?:\s(\S+)(?:\s((?:"[^"]*")|(?:\S+)))?)?)?'
         match = re.search(rex, line)
         if not match:
             print("** class name missing **")
@@ -170,33 +397,136 @@ class HBNBCommand(cmd.Cmd):
         elif not uid:
             print("** instance id missing **")
         else:
-            key = f"{classname}.{uid}"
-            if key not in storage.all():
+            obj = storage.get(classname, uid)
+            if obj is None:
                 print("** no instance found **")
             elif not attribute:
                 print("** attribute name missing **")
             elif not value:
                 print("** value missing **")
             else:
-                cast = None
-                if not re.search(r'^".*"$', value):
-                    cast = float if '.' in value else int
-                else:
-                    value = value.strip('"')
-                
-                attributes = storage.attributes()[classname]
-                if attribute in attributes:
-                    value = attributes[attribute](value)
-                elif cast:
-                    try:
-                        value = cast(value)
-                    except ValueError:
-                        pass
-                
-                setattr(storage.all()[key], attribute, value)
-                storage.all()[key].save()
+                coerce = storage.coercer(classname)
+                if len(value) > 1 and value[0] == value[-1] == '"':
+                    value = value[1:-1]
+                elif attribute not in coerce:
+                    value = literal(value)
+                try:
+                    value = coerce(attribute, value)
+                except ValueError as error:
+                    print("** {} **".format(error))
+                    return
+                try:
+                    setattr(obj, attribute, value)
+                    obj.save()
+                except PermissionError as error:
+                    print("** {} **".format(error))
+
+    def do_bulk_update(self, line):
+        """Update every instance matching a filter or a list of ids at once.
+
+        Usage: bulk_update <class> <filter or ids> <attributes dictionary>
+        or <class>.bulk_update(<filter or ids>, <attributes dictionary>)
+        """
+        words = line.split(None, 1)
+        if not words:
+            print("** class name missing **")
+            return
+        classname = words[0]
+        if classname not in storage.classes():
+            print("** class doesn't exist **")
+            return
+        try:
+            args = self.parse_json_args(words[1] if len(words) > 1 else "")
+        except ValueError:
+            print("** invalid arguments **")
+            return
+        if not args or not isinstance(args[0], (dict, list)):
+            print("** filter missing **")
+        elif len(args) < 2 or not isinstance(args[1], dict):
+            print("** attributes missing **")
+        else:
+            coerce = storage.coercer(classname)
+            try:
+                selector = args[0]
+                if isinstance(selector, dict):
+                    selector = coerce.convert(selector)
+                changes = coerce.convert(args[1])
+            except ValueError as error:
+                print("** {} **".format(error))
+                return
+            objs = self.select(classname, selector)
+            if objs:
+                now = datetime.now()
+                try:
+                    for obj in objs:
+                        for attribute, value in changes.items():
+                            setattr(obj, attribute, value)
+                        obj.updated_at = now
+                    storage.save()
+                except PermissionError as error:
+                    print("** {} **".format(error))
+                    return
+            print(len(objs))
+
+    @staticmethod
+    def parse_json_args(text):
+        """Returns the JSON values written in text, separated by commas.
+
+        Single quotes are read as double quotes if text is not valid JSON.
+        """
+        try:
+            return HBNBCommand.decode_json_args(text)
+        except ValueError:
+            return HBNBCommand.decode_json_args(text.replace("'", '"'))
+
+    @staticmethod
+    def decode_json_args(text):
+        """Returns the JSON values written in text, separated by commas."""
+        decoder = json.JSONDecoder()
+        args, position = [], 0
+        while True:
+            while position < len(text) and text[position] in " ,":
+                position += 1
+            if position == len(text):
+                return args
+            value, position = decoder.raw_decode(text, position)
+            args.append(value)
+
+    @staticmethod
+    def select(classname, selector):
+        """Returns the instances of classname listed or matched by selector.
+
+        Args:
+            - classname: name of the class of the instances
+            - selector: a list of ids, or a dictionary of attribute values
+              that every instance must have ({} matches all of them)
+        """
+        if isinstance(selector, list):
+            objs = (storage.get(classname, uid) for uid in selector)
+            return [obj for obj in objs if obj is not None]
+        criteria = list(selector.items())
+        if criteria:
+            attribute, value = criteria.pop(0)
+            candidates = storage.lookup(classname, attribute, value).values()
+        else:
+            candidates = storage.all(classname).values()
+        return [obj for obj in candidates
+                if all(getattr(obj, a, None) == v for a, v in criteria)]
 
 
 if __name__ == '__main__':
-    HBNBCommand().cmdloop()
+    count = os.getenv("HBNB_GROUP_COMMIT_COUNT")
+    interval = os.getenv("HBNB_GROUP_COMMIT_INTERVAL")
+    if count or interval:
+        storage.group_commit(
+            count=int(count) if count else None,
+            interval=float(interval) if interval else None
+        )
+    if interval:
+        threading.Thread(target=HBNBCommand.flush_every, daemon=True,
+                         args=(float(interval), threading.Event())).start()
+    try:
+        HBNBCommand().cmdloop()
+    finally:
+        storage.flush()
 
@@ -1,6 +1,31 @@
 #!/usr/bin/python3
 """Initializes the models package."""
+import sys
+from os import getenv
 from models.engine.file_storage import FileStorage
 
-storage = FileStorage()
-storage.reload()
+if getenv("HBNB_TYPE_STORAGE") == "sqlite":
+    from models.engine.sqlite_storage import SQLiteStorage
+    storage = SQLiteStorage(getenv("HBNB_SQLITE_PATH", "file.db"))
+elif getenv("HBNB_TYPE_STORAGE") == "mapped":
+    from models.engine.mapped_storage import MappedStorage
+    storage = MappedStorage(getenv("HBNB_FILE_PATH", "file.map"))
+else:
+    shards = getenv("HBNB_SHARDS")
+    storage = FileStorage(
+        journal=getenv("HBNB_JOURNAL") == "1",
+        compact_every=int(getenv("HBNB_JOURNAL_COMPACT", "1000")),
+        lazy=getenv("HBNB_LAZY_RELOAD") == "1",
+        compact=getenv("HBNB_COMPACT") == "1",
+        durability=getenv("HBNB_DURABILITY", "file"),
+        background=getenv("HBNB_ASYNC_SAVE") == "1",
+        path=getenv("HBNB_FILE_PATH"),
+        shards=int(shards) if shards and shards.isdigit() else shards,
+        workers=int(getenv("HBNB_RELOAD_WORKERS", "1")),
+        changelog=getenv("HBNB_CHANGELOG") == "1",
+        shared=getenv("HBNB_SHARED") == "1"
+    )
+# python3 -m models.engine.convert imports this package first, but only
+# converts files, so the store it may be creating is not loaded.
+if "models.engine.convert" not in getattr(sys, "orig_argv", ()):
+    storage.reload()
@@ -4,6 +4,30 @@
 import uuid
 from datetime import datetime
 from models import storage
+from models.engine.base_storage import BaseStorage
+
+_UNSET = object()
+
+
+def parse_datetime(value):
+    """Returns the datetime of an ISO 8601 string written by to_dict().
+
+    datetime.fromisoformat() is tried first as it is several times faster
+    than strptime(); strptime() still handles the formats it rejects.
+    Datetimes already decoded (e.g. by a binary snapshot) pass through.
+    """
+    if type(value) is datetime:
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ValueError("invalid isoformat string: {!r}".format(value))
 
 
 class BaseModel:
@@ -18,18 +42,39 @@ class BaseModel:
         """
         if kwargs:
             for key, value in kwargs.items():
-                if key == "created_at":
-                    self.created_at = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f")
-                elif key == "updated_at":
-                    self.updated_at = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f")
-                else:
-                    setattr(self, key, value)
+                if key == "created_at" or key == "updated_at":
+                    value = parse_datetime(value)
+                elif key == "__class__":
+                    continue
+                object.__setattr__(self, key, value)
         else:
             self.id = str(uuid.uuid4())
             self.created_at = datetime.now()
             self.updated_at = datetime.now()
             storage.new(self)
 
+    def __init_subclass__(cls, **kwargs):
+        """Registers each model class with the storage engines."""
+        super().__init_subclass__(**kwargs)
+        if not issubclass(cls, CompactModel):
+            BaseStorage.register(cls)
+
+    def __setattr__(self, name, value):
+        """Sets an attribute and flags the instance as changed.
+
+        If the storage refuses the change, the attribute is set back.
+        """
+        previous = vars(self).get(name, _UNSET)
+        super().__setattr__(name, value)
+        try:
+            storage.touch(self, name)
+        except PermissionError:
+            if previous is _UNSET:
+                super().__delattr__(name)
+            else:
+                super().__setattr__(name, previous)
+            raise
+
     def __str__(self):
         """Returns the string representation of the instance."""
         return "[{}] ({}) {}".format(type(self).__name__, self.id, self.__dict__)
@@ -37,6 +82,7 @@ class BaseModel:
     def save(self):
         """Updates the public instance attribute updated_at."""
         self.updated_at = datetime.now()
+        storage.new(self)
         storage.save()
 
     def to_dict(self):
@@ -47,3 +93,63 @@ class BaseModel:
         my_dict["updated_at"] = self.updated_at.isoformat()
         return my_dict
 
+
+BaseStorage.register(BaseModel, {
+    "id": str,
+    "created_at": datetime,
+    "updated_at": datetime
+})
+
+
+class CompactModel:
+    """Mixin for model classes keeping their declared attributes in slots.
+
+    Attributes that are not declared (e.g. set through the console's
+    update) still go to the instance __dict__.
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        """Returns the class default of a declared attribute left unset."""
+        if name in type(self).__slots__:
+            return getattr(type(self).__bases__[1], name)
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
+
+    def __fields(self):
+        """Returns the set slot values followed by the __dict__ values."""
+        fields = {}
+        for name in type(self).__slots__:
+            try:
+                fields[name] = object.__getattribute__(self, name)
+            except AttributeError:
+                pass
+        fields.update(self.__dict__)
+        return fields
+
+    def __str__(self):
+        """Returns the string representation of the instance."""
+        return "[{}] ({}) {}".format(type(self).__name__, self.id, self.__fields())
+
+    def to_dict(self):
+        """Returns a dictionary containing all keys/values of the instance."""
+        my_dict = self.__fields()
+        my_dict["__class__"] = type(self).__name__
+        my_dict["created_at"] = self.created_at.isoformat()
+        my_dict["updated_at"] = self.updated_at.isoformat()
+        return my_dict
+
+
+def compact_class(cls, fields):
+    """Returns a subclass of the model cls that keeps fields in __slots__.
+
+    The subclass keeps the name of cls, so its instances are stored and
+    serialized under the same class name.
+    """
+    return type(cls.__name__, (CompactModel, cls), {
+        "__slots__": tuple(fields),
+        "__module__": cls.__module__,
+        "__qualname__": cls.__qualname__,
+        "__doc__": cls.__doc__
+    })
@@ -0,0 +1,301 @@
+#!/usr/bin/python3
+"""Defines the BaseStorage class."""
+import bisect
+import contextlib
+import operator
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+
+
+class BaseStorage(ABC):
+    """Interface shared by the storage engines.
+
+    An engine keeps one object per "<class name>.<id>" key. BaseModel
+    calls new() when an instance is created, touch() whenever one of its
+    attributes is assigned and save() to persist it.
+    """
+
+    OPERATORS = {
+        "==": operator.eq,
+        "!=": operator.ne,
+        "<": operator.lt,
+        "<=": operator.le,
+        ">": operator.gt,
+        ">=": operator.ge
+    }
+
+    TIMES = ("created_at", "updated_at")
+    ORDERS = ("id",) + TIMES
+
+    __registry = {}
+    __attributes = {}
+    __imported = False
+
+    def __init__(self):
+        """Initializes the state shared by every engine."""
+        self.__columns = {}
+        self.__coercers = {}
+
+    @abstractmethod
+    def all(self, cls=None):
+        """Returns a dictionary of every stored object, or only those of cls."""
+
+    @abstractmethod
+    def count(self, cls=None):
+        """Returns the number of stored objects, or of objects of cls."""
+
+    @abstractmethod
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None."""
+
+    @abstractmethod
+    def new(self, obj):
+        """Adds an object to the storage."""
+
+    @abstractmethod
+    def delete(self, obj=None):
+        """Removes an object from the storage if it is present."""
+
+    @abstractmethod
+    def touch(self, obj, name=None):
+        """Flags a stored object as changed since the last save.
+
+        Args:
+            - obj: the object changed
+            - name: the attribute assigned, if known
+        """
+
+    @abstractmethod
+    def generation(self):
+        """Returns a counter that changes whenever stored objects change."""
+
+    @abstractmethod
+    def save(self):
+        """Persists the changes made since the last save."""
+
+    @abstractmethod
+    def reload(self):
+        """Drops unsaved changes and reloads the stored objects."""
+
+    def flush(self):
+        """Writes out any save the engine deferred."""
+
+    def close(self):
+        """Flushes pending saves before the process exits."""
+        self.flush()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Groups the saves made inside the block into a single write."""
+        yield self
+
+    def group_commit(self, count=None, interval=None):
+        """Sets a group-commit policy; engines without one write every save."""
+
+    def refresh(self):
+        """Loads the objects other processes saved since this one last read
+        or wrote them; returns True if there were any.
+
+        Engines not shared between processes have none.
+        """
+        return False
+
+    def lookup(self, cls, field, value):
+        """Returns a dictionary of the objects of cls whose field equals value.
+
+        Engines may answer some fields from an index; this one scans all(cls).
+        """
+        return {key: obj for key, obj in self.all(cls).items()
+                if getattr(obj, field, None) == value}
+
+    def where(self, cls, conditions, limit=None, offset=0):
+        """Returns the list of the objects of cls meeting every condition.
+
+        Candidates come from lookup() for the first equality, else from
+        the Columns mirror for ranges on numeric attributes, else from
+        between() for ranges on TIMES, else from all(cls); every condition
+        is then checked on each candidate. The matches are ordered by key,
+        so limit and offset give stable pages.
+
+        Args:
+            - cls: the model class (or class name) to query
+            - conditions: list of (attribute, operator, value) tuples, the
+              operator being one of OPERATORS
+            - limit: maximum number of objects returned
+            - offset: number of matching objects skipped first
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        for attribute, op, value in conditions:
+            if op not in BaseStorage.OPERATORS:
+                raise ValueError("unknown operator {}".format(op))
+        equal = [(a, v) for a, op, v in conditions if op == "=="]
+        ranges, times = {}, {}
+        if not equal and name in self.attributes():
+            numeric = self.columns(name).fields()
+            for attribute, op, value in conditions:
+                if attribute in numeric and op in ("<", "<=", ">", ">=") \
+                        and isinstance(value, (int, float)):
+                    low, high = ranges.get(attribute, (None, None))
+                    if op in (">", ">="):
+                        low = value if low is None else max(low, value)
+                    else:
+                        high = value if high is None else min(high, value)
+                    ranges[attribute] = (low, high)
+            for attribute, op, value in conditions:
+                if attribute in BaseStorage.TIMES and op in ("<", "<=", ">", ">=") \
+                        and isinstance(value, datetime):
+                    if op == "<=":
+                        value += timedelta(microseconds=1)
+                    start, stop = times.get(attribute, (None, None))
+                    if op in (">", ">="):
+                        start = value if start is None else max(start, value)
+                    else:
+                        stop = value if stop is None else min(stop, value)
+                    times[attribute] = (start, stop)
+        if equal:
+            candidates = self.lookup(name, *equal[0]).values()
+        elif ranges:
+            candidates = self.columns(name).where(**ranges)
+        elif times:
+            attribute, (start, stop) = next(iter(times.items()))
+            candidates = self.between(name, attribute, start, stop)
+        else:
+            candidates = self.all(name).values()
+        matches = {"{}.{}".format(name, obj.id): obj for obj in candidates
+                   if self.__meets(obj, conditions)}
+        keys = sorted(matches)[offset:]
+        if limit is not None:
+            keys = keys[:limit]
+        return [matches[key] for key in keys]
+
+    @staticmethod
+    def __meets(obj, conditions):
+        """Tells whether obj meets every (attribute, operator, value) condition."""
+        for attribute, op, value in conditions:
+            try:
+                if not BaseStorage.OPERATORS[op](getattr(obj, attribute), value):
+                    return False
+            except (AttributeError, TypeError):
+                return False
+        return True
+
+    def page(self, cls, limit=None, after=None, order="id"):
+        """Returns a list of the objects of cls sorted by order, then by key.
+
+        Engines may keep the objects sorted; this one sorts all(cls).
+
+        Args:
+            - cls: the model class (or class name) to list
+            - limit: maximum number of objects returned
+            - after: id of the object the page starts after
+            - order: attribute sorting the objects, one of ORDERS
+        """
+        if order not in BaseStorage.ORDERS:
+            raise ValueError("order must be one of {}".format(", ".join(BaseStorage.ORDERS)))
+        name = cls if isinstance(cls, str) else cls.__name__
+        objects = self.all(name)
+        entries = sorted((getattr(obj, order), key) for key, obj in objects.items())
+        start = 0
+        if after is not None:
+            key = "{}.{}".format(name, after)
+            if key in objects:
+                start = bisect.bisect_right(entries, (getattr(objects[key], order), key))
+            elif order == "id":
+                start = bisect.bisect_right(entries, (after, key))
+            else:
+                raise KeyError("no {} with id {}".format(name, after))
+        stop = None if limit is None else start + limit
+        return [objects[key] for _, key in entries[start:stop]]
+
+    def between(self, cls=None, field="updated_at", start=None, stop=None):
+        """Returns the objects whose field is in [start, stop), oldest first.
+
+        Objects with equal times are ordered by key. Engines may keep the
+        objects sorted by time; this one sorts all(cls).
+
+        Args:
+            - cls: the model class (or class name) to query, or None for all
+            - field: datetime attribute compared, one of TIMES
+            - start: earliest datetime returned, or None for no bound
+            - stop: datetime after the latest returned, or None for no bound
+        """
+        if field not in BaseStorage.TIMES:
+            raise ValueError("field must be one of {}".format(", ".join(BaseStorage.TIMES)))
+        objects = self.all(cls)
+        entries = sorted((getattr(obj, field), key) for key, obj in objects.items())
+        return [objects[key] for _, key in BaseStorage.span(entries, start, stop)]
+
+    @staticmethod
+    def span(entries, start=None, stop=None):
+        """Returns the (value, key) entries with a value in [start, stop).
+
+        Args:
+            - entries: list of (value, key) pairs sorted by value, then key
+            - start: smallest value returned, or None for no bound
+            - stop: value above the largest returned, or None for no bound
+        """
+        low = 0 if start is None else bisect.bisect_left(entries, (start,))
+        high = len(entries) if stop is None else bisect.bisect_left(entries, (stop,))
+        return entries[low:high]
+
+    def columns(self, cls="Place"):
+        """Returns the Columns mirror of the numeric attributes of cls."""
+        from models.engine.columns import Columns
+
+        name = cls if isinstance(cls, str) else cls.__name__
+        if name not in self.__columns:
+            self.__columns[name] = Columns(self, name)
+        return self.__columns[name]
+
+    def coercer(self, cls):
+        """Returns the Coercer converting values to the attribute types of cls."""
+        from models.engine.coercion import Coercer
+
+        name = cls if isinstance(cls, str) else cls.__name__
+        if name not in self.__coercers:
+            attributes = self.attributes()
+            declared = dict(attributes["BaseModel"])
+            declared.update(attributes.get(name, {}))
+            self.__coercers[name] = Coercer(declared)
+        return self.__coercers[name]
+
+    def classes(self):
+        """Returns a dictionary of valid classes and their references.
+
+        The dictionary is the registry shared by every engine: the standard
+        models are imported on the first call, and any other BaseModel
+        subclass is added by register() when it is defined. It must not be
+        modified by callers.
+        """
+        if not BaseStorage.__imported:
+            from models import base_model, user, state, city  # noqa: F401
+            from models import amenity, place, review  # noqa: F401
+            BaseStorage.__imported = True
+        return BaseStorage.__registry
+
+    def attributes(self):
+        """Returns the valid attributes and their types for each class."""
+        BaseStorage.classes(self)
+        return BaseStorage.__attributes
+
+    @staticmethod
+    def register(cls, attributes=None):
+        """Adds a model class to the registry returned by classes().
+
+        BaseModel calls it for itself and for each of its subclasses.
+
+        Args:
+            - cls: the model class
+            - attributes: dictionary of attribute names and types; by default
+              the public class attributes (inherited ones included) and the
+              types of their defaults
+        """
+        if attributes is None:
+            attributes = {}
+            for klass in reversed(cls.__mro__):
+                attributes.update(
+                    (name, type(value)) for name, value in vars(klass).items()
+                    if not name.startswith("_") and not callable(value)
+                    and not isinstance(value, (property, staticmethod, classmethod)))
+        BaseStorage.__registry[cls.__name__] = cls
+        BaseStorage.__attributes[cls.__name__] = attributes
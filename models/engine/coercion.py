@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+"""Defines the Coercer class."""
+import json
+from datetime import datetime
+from models.base_model import parse_datetime
+
+
+def literal(text):
+    """Returns the int or float written in text, or text itself."""
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _to_str(value):
+    """Returns value as a string; numbers are converted."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise TypeError
+
+
+def _to_int(value):
+    """Returns value as an int; floats and strings must hold a whole number."""
+    if isinstance(value, bool):
+        raise TypeError
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    raise TypeError
+
+
+def _to_float(value):
+    """Returns value as a float."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise TypeError
+    return float(value)
+
+
+def _to_list(value):
+    """Returns value as a list; strings must hold a JSON array."""
+    if isinstance(value, str):
+        value = json.loads(value)
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    raise TypeError
+
+
+def _to_datetime(value):
+    """Returns value as a datetime; strings must be in ISO 8601 format."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return parse_datetime(value)
+    raise TypeError
+
+
+class Coercer:
+    """Converts attribute values of one model class to their declared types.
+
+    The conversion function of every attribute declared in attributes()
+    is picked once when the coercer is built, so converting a value is a
+    dictionary lookup and a call. Values that cannot be converted raise
+    ValueError instead of being stored as they are; attributes that are
+    not declared keep their value.
+    """
+
+    CONVERSIONS = {
+        str: _to_str,
+        int: _to_int,
+        float: _to_float,
+        list: _to_list,
+        datetime: _to_datetime
+    }
+
+    def __init__(self, attributes):
+        """Picks the conversion of each declared attribute.
+
+        Args:
+            - attributes: dictionary of attribute names and types
+        """
+        self.__conversions = {}
+        for name, kind in attributes.items():
+            if kind in Coercer.CONVERSIONS:
+                self.__conversions[name] = (Coercer.CONVERSIONS[kind], kind.__name__)
+
+    def __contains__(self, name):
+        """Returns True if a type is declared for the attribute name."""
+        return name in self.__conversions
+
+    def __call__(self, name, value):
+        """Returns value converted to the type declared for the attribute name."""
+        conversion = self.__conversions.get(name)
+        if conversion is None:
+            return value
+        function, kind = conversion
+        try:
+            return function(value)
+        except (TypeError, ValueError):
+            raise ValueError("{} must be {}, not {!r}".format(name, kind, value)) from None
+
+    def convert(self, values):
+        """Returns a dictionary of attribute values converted to their types.
+
+        Raises ValueError for the first value that cannot be converted, so
+        callers can reject a whole update before applying any of it.
+        """
+        return {name: self(name, value) for name, value in values.items()}
@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+"""Defines the Columns class."""
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Columns:
+    """Column-oriented mirror of the numeric attributes of one model class.
+
+    Every int or float attribute declared for the class in attributes() is
+    copied into a contiguous array of doubles (a NumPy array when NumPy is
+    installed), so that range filters and aggregates run over the arrays
+    instead of the objects. Unset or non-numeric values are stored as NaN
+    and never match a range. The mirror is rebuilt on the first query
+    after the storage has changed.
+    """
+
+    def __init__(self, storage, cls="Place"):
+        """Initializes the mirror of the numeric attributes of cls.
+
+        Args:
+            - storage: the storage engine holding the objects
+            - cls: the model class (or class name) to mirror
+        """
+        self.__storage = storage
+        self.__name = cls if isinstance(cls, str) else cls.__name__
+        self.__fields = [name for name, kind
+                         in storage.attributes()[self.__name].items()
+                         if kind in (int, float)]
+        self.__generation = None
+        self.__objects = []
+        self.__columns = {}
+
+    def fields(self):
+        """Returns the names of the mirrored attributes."""
+        return list(self.__fields)
+
+    def where(self, **ranges):
+        """Returns the objects whose attributes lie within the given ranges.
+
+        Each keyword maps an attribute to a (low, high) pair of inclusive
+        bounds, where None leaves that side open, e.g.
+        where(price_by_night=(None, 100), max_guest=(4, None)).
+        """
+        return [self.__objects[i] for i in self.__select(ranges)]
+
+    def count(self, **ranges):
+        """Returns the number of objects within the given ranges."""
+        return len(self.__select(ranges))
+
+    def sum(self, field, **ranges):
+        """Returns the sum of field over the objects within the ranges."""
+        values = self.__values(field, ranges)
+        return float(numpy.sum(values)) if numpy else float(sum(values))
+
+    def mean(self, field, **ranges):
+        """Returns the mean of field over the objects within the ranges."""
+        values = self.__values(field, ranges)
+        if not len(values):
+            return None
+        return float(numpy.mean(values)) if numpy else sum(values) / len(values)
+
+    def min(self, field, **ranges):
+        """Returns the smallest field value within the ranges."""
+        values = self.__values(field, ranges)
+        if not len(values):
+            return None
+        return float(numpy.min(values)) if numpy else min(values)
+
+    def max(self, field, **ranges):
+        """Returns the largest field value within the ranges."""
+        values = self.__values(field, ranges)
+        if not len(values):
+            return None
+        return float(numpy.max(values)) if numpy else max(values)
+
+    def __refresh(self):
+        """Rebuilds the arrays if the storage changed since the last build."""
+        generation = self.__storage.generation()
+        if generation == self.__generation:
+            return
+        self.__objects = list(self.__storage.all(self.__name).values())
+        self.__columns = {}
+        for field in self.__fields:
+            column = array("d", (self.__number(getattr(obj, field, None))
+                                 for obj in self.__objects))
+            self.__columns[field] = numpy.array(column, dtype=float) if numpy else column
+        self.__generation = generation
+
+    @staticmethod
+    def __number(value):
+        """Returns value as a float, or NaN if it is not a number."""
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return float("nan")
+
+    def __column(self, field):
+        """Returns the array of field, raising KeyError if it is unknown."""
+        if field not in self.__columns:
+            raise KeyError("{} has no numeric attribute {}".format(
+                self.__name, field))
+        return self.__columns[field]
+
+    def __select(self, ranges):
+        """Returns the positions of the objects within all the ranges."""
+        self.__refresh()
+        if numpy:
+            mask = numpy.ones(len(self.__objects), dtype=bool)
+            for field, (low, high) in ranges.items():
+                column = self.__column(field)
+                mask &= ~numpy.isnan(column)
+                if low is not None:
+                    mask &= column >= low
+                if high is not None:
+                    mask &= column <= high
+            return numpy.flatnonzero(mask)
+        selected = range(len(self.__objects))
+        for field, (low, high) in ranges.items():
+            column = self.__column(field)
+            low = float("-inf") if low is None else low
+            high = float("inf") if high is None else high
+            selected = [i for i in selected if low <= column[i] <= high]
+        return list(selected)
+
+    def __values(self, field, ranges):
+        """Returns the non-NaN values of field within the ranges."""
+        positions = self.__select(ranges)
+        column = self.__column(field)
+        if numpy:
+            values = column[positions]
+            return values[~numpy.isnan(values)]
+        values = (column[i] for i in positions)
+        return [v for v in values if v == v]
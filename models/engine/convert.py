@@ -0,0 +1,17 @@
+#!/usr/bin/python3
+"""Converts a store between the JSON, binary and mapped formats.
+
+Usage:
+    python3 -m models.engine.convert file.json file.bin
+    python3 -m models.engine.convert file.bin file.json
+    python3 -m models.engine.convert file.json file.map
+"""
+import sys
+from models.engine.snapshot import convert
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: {} <source> <destination>".format(sys.argv[0]))
+        sys.exit(1)
+    convert(sys.argv[1], sys.argv[2])
@@ -1,101 +1,1313 @@
 #!/usr/bin/python3
 """Defines the FileStorage class."""
-import datetime
+import atexit
+import bisect
+import contextlib
+import gc
+import heapq
 import json
+import multiprocessing
 import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import fcntl
+except ImportError:  # no advisory locks outside POSIX
+    fcntl = None
+try:
+    _FORK = multiprocessing.get_context("fork")
+except ValueError:  # no fork outside POSIX
+    _FORK = None
+from models.engine import snapshot
+from models.engine.base_storage import BaseStorage
 
 
-class FileStorage:
-    """Handles storing and retrieving data."""
+@contextlib.contextmanager
+def _gc_paused():
+    """Suspends the cyclic garbage collector inside the block.
+
+    A reload allocates one object per stored record and none of them form
+    reference cycles, but every allocation threshold would still start a
+    collection pass over all the objects built so far.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _decode(task):
+    """Decodes a stored file, or a range of its lines, in a reload worker.
+
+    Args:
+        - task: (path, binary, start, end) where start and end are the byte
+          offsets of whole object lines of a JSON file, or None for all
+
+    Returns:
+        a list of (key, class name, keyword arguments) with parsed datetimes
+    """
+    from models.base_model import parse_datetime
+
+    path, binary, start, end = task
+    with open(path, "rb") as f:
+        if binary:
+            return snapshot.load(f)
+        if start is None:
+            values = json.load(f)
+        else:
+            f.seek(start)
+            text = f.read(end - start).decode("utf-8").rstrip().rstrip(",")
+            values = json.loads("{" + text + "}")
+    decoded = []
+    for key, value in values.items():
+        for field in ("created_at", "updated_at"):
+            if field in value:
+                value[field] = parse_datetime(value[field])
+        decoded.append((key, value["__class__"], value))
+    return decoded
+
+
+def _decode_all(tasks, connection):
+    """Runs _decode() on each task in a forked reload worker and sends the
+    list of results, or the exception raised, through connection.
+    """
+    try:
+        result = [_decode(task) for task in tasks]
+    except Exception as error:
+        result = error
+    connection.send(result)
+    connection.close()
+
+
+class FileStorage(BaseStorage):
+    """Handles storing and retrieving data in a JSON file.
+
+    The JSON file holds one object per line and is replaced atomically: a
+    save writes a temporary sibling, optionally fsyncs it ("file") and its
+    directory ("dir"), then renames it over the old file. Each object's
+    JSON text is cached between saves and only re-encoded after new(),
+    delete() or an attribute assignment has flagged it dirty.
+
+    save() is deferred inside batch() blocks, and under a group-commit
+    policy until enough saves or time have accumulated; flush() forces a
+    deferred save out.
+
+    In background mode, save() only encodes the changes and hands the
+    write to a writer thread; saves queued behind a pending snapshot are
+    coalesced into it. flush() and close() wait for the writer, and
+    close() runs at interpreter exit.
+
+    In journal mode, save() appends the objects changed since the previous
+    save to a log next to the JSON file instead of rewriting the whole
+    file; the log is folded back into the file once it holds compact_every
+    records.
+
+    Keys are also bucketed by class name so that all(cls) and count(cls)
+    only visit the objects of that class.
+
+    The fields listed in indexes (INDEXES by default) get hash indexes
+    from (class name, field, value) to keys for every class declaring
+    them in attributes(), so lookup() returns the matching objects
+    without scanning the store. The indexes are built by the first
+    lookup() after a reload and then kept up to date by new(), delete()
+    and attribute assignments. Only string values are indexed.
+
+    page() reads from sorted lists of (value, key) pairs, one per class
+    and order in ORDERS, built by the first page() after a reload and
+    then kept sorted by new(), delete() and attribute assignments with
+    bisect, so a page costs O(log n + limit). between() answers time
+    ranges from the same lists for created_at and updated_at.
+
+    Every change bumps the generation counter.
+
+    Each save publishes the changes it writes as an ordered stream of
+    events to the callbacks registered with subscribe() and, with
+    changelog, appends them as JSON lines to a log next to the JSON file.
+    An event is a dictionary holding its sequence number "seq", its "op"
+    ("create", "update" or "delete"), the object "key" and the "fields"
+    that changed, in their to_dict() form: every field for a creation,
+    the assigned attributes for an update, none for a deletion. An update
+    lists every field once the object went through new() again, or
+    touch() without a name, since it may have changed in place. The
+    changes made to an object between two saves are merged into one
+    event; the sequence numbers carry on across the changelog of earlier
+    runs, and events() reads them back from a given number. Events are
+    published once their write succeeded, from the writer thread in
+    background mode.
+
+    A path ending in ".bin" (or format="binary") stores a binary snapshot
+    (see models.engine.snapshot) instead of JSON; such snapshots are always
+    reloaded eagerly.
+
+    In compact mode, classes() hands out subclasses of the models that keep
+    the attributes declared in attributes() in __slots__ rather than in a
+    per-instance __dict__.
+
+    In lazy mode, reload() only records where each object's line starts in
+    the JSON file; an object is built the first time all() or get()
+    reaches it.
+
+    In sharded mode, objects are split across files named after the path
+    with the shard inserted before the extension (file.Place.json, or
+    file.3.json for hash buckets), by class name (shards="class") or by
+    a CRC-32 of the id into a fixed number of buckets (shards=N). save()
+    only rewrites the shards holding changed objects, each atomically,
+    and reload() reads the shards from a thread pool. The number of hash
+    buckets must stay the same for a given store.
+
+    In shared mode, several processes can use the same files. save()
+    holds an exclusive advisory lock on a ".lock" file next to the JSON
+    file and reload() a shared one. Each file is stamped with its inode,
+    size and modification time when this process reads or writes it; if
+    another process saved since, save() and refresh() first load what
+    it changed: only the changed shards, or only the records appended to
+    the journal when the JSON file itself is untouched; a rewritten JSON
+    file is reloaded whole. Objects with unsaved changes in this process
+    keep them, so the last save of an object wins.
+
+    With workers above one, reload() decodes the files and parses their
+    datetimes in a pool of that many processes, one task per shard or per
+    byte range of a one-object-per-line JSON file, and only builds the
+    objects in this process. The workers are forked, since a spawned
+    one would import models and reload the whole storage itself; where
+    fork is missing, as in lazy mode and for unsharded binary snapshots,
+    reload() decodes in this process.
+    """
 
     __file_path = "file.json"
     __objects = {}
 
-    def all(self):
-        """Returns the dictionary __objects."""
-        return FileStorage.__objects
+    DURABILITY = ("none", "file", "dir")
+    INDEXES = ("city_id", "state_id", "place_id", "user_id")
+
+    def __init__(self, *, journal=False, compact_every=1000, lazy=False,
+                 compact=False, durability="file", background=False,
+                 path=None, format=None, shards=None, workers=1,
+                 indexes=INDEXES, changelog=False, shared=False):
+        """Initializes the storage settings.
+
+        Args:
+            - journal: append changes to a log instead of rewriting the file
+            - compact_every: number of journal records kept before compaction
+            - lazy: defer building objects in reload() until they are read
+            - compact: keep declared model attributes in __slots__
+            - durability: what a save fsyncs, one of DURABILITY
+            - background: write saves from a writer thread
+            - path: file to use instead of __file_path
+            - format: "json" or "binary"; by default the path extension decides
+            - shards: "class" or a number of hash buckets to split files by
+            - workers: number of processes decoding the files in reload()
+            - indexes: names of the fields lookup() answers from hash indexes
+            - changelog: append the change events of every save to a log
+            - shared: lock the files and merge the saves of other processes
+        """
+        super().__init__()
+        if durability not in FileStorage.DURABILITY:
+            raise ValueError("durability must be one of {}".format(
+                ", ".join(FileStorage.DURABILITY)))
+        self.__journal = journal
+        self.__compact_every = compact_every
+        self.__lazy = lazy
+        self.__compact = compact
+        self.__compact_classes = None
+        self.__durability = durability
+        self.__path = path or FileStorage.__file_path
+        if format not in (None, "json", "binary"):
+            raise ValueError("format must be json or binary")
+        if format is None:
+            format = "binary" if snapshot.is_snapshot(self.__path) else "json"
+        self.__binary = format == "binary"
+        if not (shards in (None, "class") or type(shards) is int and shards > 0):
+            raise ValueError('shards must be "class" or a positive number')
+        if shards is not None and (journal or lazy):
+            raise ValueError("shards cannot be combined with journal or lazy mode")
+        self.__shards = shards
+        if shared and (background or lazy):
+            raise ValueError("shared cannot be combined with background or lazy mode")
+        self.__shared = shared
+        self.__stamp = {}
+        if not (type(workers) is int and workers > 0):
+            raise ValueError("workers must be a positive number")
+        self.__workers = workers
+        self.__indexes = tuple(indexes)
+        self.__index_values = None
+        self.__index_keys = {}
+        self.__index_fields = {}
+        self.__orders = {}
+        self.__changelog = changelog
+        self.__changes = {} if changelog else None
+        self.__subscribers = []
+        self.__sequence = None
+        self.__saved = None
+        self.__records = {}
+        self.__tags = {}
+        self.__journal_size = 0
+        self.__dirty = {}
+        self.__fragments = {}
+        self.__offsets = {}
+        self.__classes = {}
+        self.__indexed = None
+        self.__generation = 0
+        self.__batch_depth = 0
+        self.__deferred = False
+        self.__group = None
+        self.__group_saves = 0
+        self.__group_started = 0
+        self.__background = background
+        self.__file_lock = threading.Lock()
+        self.__writes = threading.Condition()
+        self.__jobs = []
+        self.__writer = None
+        self.__error = None
+        if background:
+            atexit.register(self.close)
+
+    def all(self, cls=None):
+        """Returns the dictionary __objects, or only the objects of cls."""
+        if cls is None:
+            if self.__offsets:
+                self.__materialize(list(self.__offsets))
+            return FileStorage.__objects
+        keys = self.__bucket(cls)
+        pending = [k for k in keys if k in self.__offsets]
+        if pending:
+            self.__materialize(pending)
+        return {k: FileStorage.__objects[k] for k in keys}
+
+    def count(self, cls=None):
+        """Returns the number of stored objects, or of objects of cls."""
+        if cls is None:
+            return len(FileStorage.__objects) + len(self.__offsets)
+        return len(self.__bucket(cls))
+
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None."""
+        name = cls if isinstance(cls, str) else cls.__name__
+        key = "{}.{}".format(name, id)
+        if key in self.__offsets:
+            self.__materialize([key])
+        return FileStorage.__objects.get(key)
 
     def new(self, obj):
         """Adds an object to __objects with key <obj class name>.id."""
         key = "{}.{}".format(type(obj).__name__, obj.id)
+        added = FileStorage.__objects.get(key) is not obj
         FileStorage.__objects[key] = obj
+        if self.__offsets:
+            with self.__file_lock:
+                self.__offsets.pop(key, None)
+        self.__classes.setdefault(type(obj).__name__, set()).add(key)
+        if self.__index_values is not None:
+            self.__index_object(key, obj)
+        if self.__orders:
+            self.__sort_object(key, obj)
+        if self.__changes is not None:
+            if added:
+                self.__changes.pop(key, None)
+                self.__changes[key] = "create"
+            else:
+                self.__change(key, None)
+        self.__dirty[key] = obj
+        self.__generation += 1
+
+    def delete(self, obj=None):
+        """Removes an object from __objects if it is present."""
+        if obj is None:
+            return
+        key = "{}.{}".format(type(obj).__name__, obj.id)
+        with self.__file_lock:
+            found = (FileStorage.__objects.pop(key, None) is not None
+                     or self.__offsets.pop(key, None) is not None)
+        if found:
+            self.__classes.get(type(obj).__name__, set()).discard(key)
+            if self.__index_values is not None:
+                self.__unindex_object(key)
+            if self.__orders:
+                self.__unsort_object(key)
+            if self.__changes is not None:
+                self.__changes.pop(key, None)
+                self.__changes[key] = "delete"
+            self.__dirty[key] = None
+            self.__generation += 1
+
+    def touch(self, obj, name=None):
+        """Flags a stored object as changed since the last save.
+
+        Args:
+            - obj: the object changed
+            - name: the attribute assigned; if None, an update event lists
+              every field
+        """
+        key = "{}.{}".format(type(obj).__name__, getattr(obj, "id", None))
+        if FileStorage.__objects.get(key) is obj:
+            if self.__index_values is not None:
+                self.__index_object(key, obj)
+            if self.__orders:
+                self.__sort_object(key, obj)
+            if self.__changes is not None:
+                self.__change(key, name)
+            self.__dirty[key] = obj
+            self.__generation += 1
+
+    def generation(self):
+        """Returns a counter that changes whenever stored objects change."""
+        if self.__indexed is not FileStorage.__objects:
+            self.__reindex()
+        return self.__generation
 
     def save(self):
-        """Serializes __objects to the JSON file (path: __file_path)."""
-        with open(FileStorage.__file_path, "w", encoding="utf-8") as f:
-            obj_dict = {k: v.to_dict() for k, v in FileStorage.__objects.items()}
-            json.dump(obj_dict, f)
+        """Serializes __objects to the file (default path: __file_path)."""
+        if self.__batch_depth or not self.__commit_due():
+            self.__deferred = True
+            return
+        self.__commit()
+
+    def flush(self):
+        """Writes out any deferred save and waits for the writer thread."""
+        if self.__deferred:
+            self.__commit()
+        self.__drain()
+
+    def close(self):
+        """Flushes pending saves; later saves are written synchronously."""
+        self.flush()
+        self.__background = False
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Defers every save() until the outermost batch exits.
+
+        The block's changes are then written once. If the block raises,
+        nothing is written and the changes stay pending for the next save.
+        """
+        self.__batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.__batch_depth -= 1
+        if not self.__batch_depth:
+            self.flush()
+
+    def group_commit(self, count=None, interval=None):
+        """Sets the group-commit policy; with no arguments every save writes.
+
+        Args:
+            - count: write once this many saves have been requested
+            - interval: write once this many seconds passed since the first
+              deferred save
+        """
+        if count is None and interval is None:
+            self.__group = None
+            self.flush()
+        else:
+            self.__group = (count, interval)
+        self.__group_saves = 0
+
+    def __commit_due(self):
+        """Counts a save request and tells whether the policy lets it write."""
+        if self.__group is None:
+            return True
+        count, interval = self.__group
+        self.__group_saves += 1
+        if self.__group_saves == 1:
+            self.__group_started = time.monotonic()
+        return ((count is not None and self.__group_saves >= count)
+                or (interval is not None
+                    and time.monotonic() - self.__group_started >= interval))
+
+    def __commit(self):
+        """Writes the pending changes to the journal or the JSON file."""
+        with self.__locked(exclusive=True):
+            if self.__shared:
+                self.__merge()
+            snapshot = not (self.__journal and os.path.isfile(self.__path)
+                            and self.__journal_size < self.__compact_every)
+            for key in self.__dirty:
+                self.__fragments.pop(key, None)
+                self.__records.pop(key, None)
+            if snapshot:
+                job, paths = self.__snapshot_job()
+            else:
+                job, paths = self.__journal_job(), None
+            if self.__background:
+                self.__enqueue(job, paths, self.__events() if self.__changes else [])
+                events = []
+            else:
+                job()
+                events = []
+                if self.__changes:
+                    if self.__shared:
+                        self.__sequence = None
+                    events = self.__events()
+                    self.__log(events)
+            if self.__shared:
+                self.__stamp = self.__stamps()
+        self.__dirty = {}
+        self.__deferred = False
+        self.__group_saves = 0
+        if events:
+            self.__publish(events)
+
+    def subscribe(self, callback):
+        """Calls callback with each change event published by later saves.
+
+        Only changes made after the first subscription are tracked. In
+        background mode, callback runs on the writer thread.
+        """
+        if self.__changes is None:
+            self.__changes = {}
+        self.__subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Stops calling a callback registered with subscribe()."""
+        self.__subscribers.remove(callback)
+        if not self.__subscribers and not self.__changelog:
+            self.__changes = None
+
+    def events(self, since=0):
+        """Returns the changelog events with a sequence number above since."""
+        events = []
+        if not os.path.isfile(self.__changelog_path()):
+            return events
+        with open(self.__changelog_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break  # torn final event from an interrupted append
+                if event["seq"] > since:
+                    events.append(event)
+        return events
+
+    def __change(self, key, name):
+        """Records an attribute assignment for the next update event."""
+        change = self.__changes.pop(key, None)
+        if change is None:
+            change = set()
+        if name is None and change != "create":
+            change = "update"
+        elif isinstance(change, set):
+            change.add(name)
+        self.__changes[key] = change
+
+    def __events(self):
+        """Returns the change events of the changes made since the last save."""
+        if self.__sequence is None:
+            self.__sequence = self.__last_sequence()
+        events = []
+        for key, change in self.__changes.items():
+            fields = {}
+            if change != "delete":
+                obj = FileStorage.__objects.get(key)
+                if obj is None:
+                    continue
+                fields = obj.to_dict()
+                if isinstance(change, set):
+                    fields = {n: fields[n] for n in sorted(change) if n in fields}
+            self.__sequence += 1
+            op = change if change in ("create", "delete") else "update"
+            events.append({"seq": self.__sequence, "op": op, "key": key, "fields": fields})
+        self.__changes = {}
+        return events
+
+    def __log(self, events):
+        """Appends events to the changelog, if it is kept.
+
+        In shared mode this runs under the exclusive lock, after the
+        sequence was read back from the changelog, so that processes
+        saving in turn number their events one after the other.
+        """
+        if self.__changelog:
+            lines = [json.dumps(event, default=str) + "\n" for event in events]
+            with open(self.__changelog_path(), "a", encoding="utf-8") as f:
+                f.writelines(lines)
+                self.__sync_file(f)
+
+    def __publish(self, events):
+        """Hands events to the subscribers."""
+        for callback in list(self.__subscribers):
+            for event in events:
+                callback(event)
+
+    def __changelog_path(self):
+        """Returns the path of the changelog kept beside the JSON file."""
+        return self.__path + ".changes"
+
+    def __last_sequence(self):
+        """Returns the sequence number of the last event in the changelog."""
+        if not self.__changelog or not os.path.isfile(self.__changelog_path()):
+            return 0
+        with open(self.__changelog_path(), "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            window = 4096
+            while True:
+                f.seek(max(0, size - window))
+                lines = f.read().splitlines()
+                for line in reversed(lines[1:] if window < size else lines):
+                    try:
+                        return json.loads(line)["seq"]
+                    except ValueError:
+                        continue  # torn final event from an interrupted append
+                if window >= size:
+                    return 0
+                window *= 4
+
+    def __enqueue(self, job, paths, events):
+        """Queues a write job for the background writer thread.
+
+        A snapshot replaces the waiting journal appends and the waiting
+        snapshots of no other files than those it rewrites, since it
+        already holds their changes; in sharded mode, the snapshots of
+        other shards stay queued. The events of a replaced job, and of
+        the jobs queued after it, move to the snapshot so that they are
+        still published in order and only once their changes are written.
+
+        Args:
+            - job: function writing the changes
+            - paths: set of the files a snapshot rewrites, or None for a
+              journal append
+            - events: change events to publish once the job has written
+        """
+        with self.__writes:
+            if paths is not None:
+                jobs, held = [], []
+                for queued, queued_paths, queued_events in self.__jobs:
+                    covered = queued_paths is None or queued_paths <= paths
+                    if covered or held:
+                        held.extend(queued_events)
+                        queued_events = []
+                    if not covered:
+                        jobs.append((queued, queued_paths, queued_events))
+                self.__jobs = jobs
+                events = held + events
+            self.__jobs.append((job, paths, events))
+            if self.__writer is None:
+                self.__writer = threading.Thread(target=self.__run_jobs,
+                                                 name="FileStorage-writer",
+                                                 daemon=True)
+                self.__writer.start()
+
+    def __run_jobs(self):
+        """Runs queued write jobs in order until the queue is empty and
+        publishes the events of each job that wrote.
+        """
+        while True:
+            with self.__writes:
+                if not self.__jobs:
+                    self.__writer = None
+                    self.__writes.notify_all()
+                    return
+                job, _, events = self.__jobs.pop(0)
+            try:
+                job()
+                if events:
+                    self.__log(events)
+                    self.__publish(events)
+            except Exception as error:
+                self.__error = error
+
+    def __drain(self):
+        """Waits for the writer thread and raises the last error it hit."""
+        with self.__writes:
+            while self.__writer is not None:
+                self.__writes.wait()
+            error, self.__error = self.__error, None
+        if error is not None:
+            raise error
+
+    def __bucket(self, cls):
+        """Returns the set of stored keys belonging to the class cls."""
+        if self.__indexed is not FileStorage.__objects:
+            self.__reindex()
+        name = cls if isinstance(cls, str) else cls.__name__
+        return self.__classes.get(name, set())
+
+    def __reindex(self):
+        """Rebuilds the per-class key buckets from the stored keys.
+
+        The field indexes and sorted lists are dropped, to be rebuilt by
+        the next lookup() or page().
+        """
+        self.__classes = {}
+        for key in list(FileStorage.__objects) + list(self.__offsets):
+            self.__classes.setdefault(key.split(".", 1)[0], set()).add(key)
+        self.__index_values = None
+        self.__index_keys = {}
+        self.__orders = {}
+        self.__indexed = FileStorage.__objects
+        self.__generation += 1
+
+    def lookup(self, cls, field, value):
+        """Returns a dictionary of the objects of cls whose field equals value.
+
+        Fields in indexes are answered from their hash index, any other
+        field by scanning the objects of cls.
+        """
+        name = cls if isinstance(cls, str) else cls.__name__
+        if field not in self.__fields_indexed(name):
+            return super().lookup(cls, field, value)
+        if self.__indexed is not FileStorage.__objects:
+            self.__reindex()
+        if self.__index_values is None:
+            self.__index_values = {}
+            with _gc_paused():
+                for key, obj in self.all().items():
+                    self.__index_object(key, obj)
+        keys = self.__index_keys.get((name, field, value), ())
+        return {k: FileStorage.__objects[k] for k in keys}
+
+    def page(self, cls, limit=None, after=None, order="id"):
+        """Returns a list of the objects of cls sorted by order, then by key.
+
+        Args:
+            - cls: the model class (or class name) to list
+            - limit: maximum number of objects returned
+            - after: id of the object the page starts after
+            - order: attribute sorting the objects, one of ORDERS
+        """
+        if order not in BaseStorage.ORDERS:
+            raise ValueError("order must be one of {}".format(", ".join(BaseStorage.ORDERS)))
+        name = cls if isinstance(cls, str) else cls.__name__
+        entries, values = self.__sorted(name, order)
+        start = 0
+        if after is not None:
+            key = "{}.{}".format(name, after)
+            if key in values:
+                start = bisect.bisect_right(entries, (values[key], key))
+            elif order == "id":
+                start = bisect.bisect_right(entries, (after, key))
+            else:
+                raise KeyError("no {} with id {}".format(name, after))
+        stop = None if limit is None else start + limit
+        return [FileStorage.__objects[key] for _, key in entries[start:stop]]
+
+    def between(self, cls=None, field="updated_at", start=None, stop=None):
+        """Returns the objects whose field is in [start, stop), oldest first.
+
+        Objects with equal times are ordered by key; without cls, the
+        classes are merged into one timeline.
+
+        Args:
+            - cls: the model class (or class name) to query, or None for all
+            - field: datetime attribute compared, one of TIMES
+            - start: earliest datetime returned, or None for no bound
+            - stop: datetime after the latest returned, or None for no bound
+        """
+        if field not in BaseStorage.TIMES:
+            raise ValueError("field must be one of {}".format(", ".join(BaseStorage.TIMES)))
+        if cls is None:
+            names = self.classes()
+        else:
+            names = [cls if isinstance(cls, str) else cls.__name__]
+        spans = [BaseStorage.span(self.__sorted(name, field)[0], start, stop)
+                 for name in names]
+        return [FileStorage.__objects[key] for _, key in heapq.merge(*spans)]
+
+    def __sorted(self, name, order):
+        """Returns the sorted (value, key) list of a class and its values.
+
+        The list is built on first use after a reload and then kept sorted
+        by __sort_object() and __unsort_object().
+        """
+        if self.__indexed is not FileStorage.__objects:
+            self.__reindex()
+        if (name, order) not in self.__orders:
+            with _gc_paused():
+                values = {key: getattr(obj, order) for key, obj in self.all(name).items()}
+                entries = sorted((value, key) for key, value in values.items())
+            self.__orders[(name, order)] = (entries, values)
+        return self.__orders[(name, order)]
+
+    def __sort_object(self, key, obj):
+        """Moves a stored object to its place in the sorted lists of its class."""
+        name = type(obj).__name__
+        for order in BaseStorage.ORDERS:
+            if (name, order) not in self.__orders:
+                continue
+            entries, values = self.__orders[(name, order)]
+            value = getattr(obj, order, None)
+            if key in values:
+                if values[key] == value:
+                    continue
+                del entries[bisect.bisect_left(entries, (values[key], key))]
+            values[key] = value
+            bisect.insort(entries, (value, key))
+
+    def __unsort_object(self, key):
+        """Removes a stored object from the sorted lists of its class."""
+        name = key.split(".", 1)[0]
+        for order in BaseStorage.ORDERS:
+            entries, values = self.__orders.get((name, order), (None, {}))
+            if key in values:
+                del entries[bisect.bisect_left(entries, (values.pop(key), key))]
+
+    def __fields_indexed(self, name):
+        """Returns the indexed fields declared for the class name."""
+        fields = self.__index_fields.get(name)
+        if fields is None:
+            declared = self.attributes().get(name, {})
+            fields = tuple(f for f in self.__indexes if f in declared)
+            self.__index_fields[name] = fields
+        return fields
+
+    def __index_object(self, key, obj):
+        """Adds the indexed field values of a stored object to the indexes."""
+        name = type(obj).__name__
+        values = []
+        for field in self.__fields_indexed(name):
+            value = getattr(obj, field, None)
+            if type(value) is str:
+                values.append((field, value))
+        values = tuple(values)
+        if self.__index_values.get(key) == values:
+            return
+        self.__unindex_object(key)
+        for field, value in values:
+            self.__index_keys.setdefault((name, field, value), set()).add(key)
+        self.__index_values[key] = values
+
+    def __unindex_object(self, key):
+        """Removes the indexed field values of a stored object."""
+        name = key.split(".", 1)[0]
+        for field, value in self.__index_values.pop(key, ()):
+            keys = self.__index_keys[(name, field, value)]
+            keys.discard(key)
+            if not keys:
+                del self.__index_keys[(name, field, value)]
+
+    def __journal_path(self):
+        """Returns the path of the journal kept beside the JSON file."""
+        return self.__path + ".journal"
+
+    def __fragment(self, key, obj):
+        """Returns the cached JSON texts of a stored object's key and value."""
+        cached = self.__fragments.get(key)
+        if cached is None or cached[0] is not obj:
+            cached = (obj, json.dumps(key), json.dumps(obj.to_dict()))
+            self.__fragments[key] = cached
+        return cached[1], cached[2]
+
+    def __encode(self, keys=None):
+        """Returns (key, key JSON, value JSON) for every stored object.
+
+        Only the objects under keys are encoded when keys is given. Dirty
+        objects are re-encoded, and objects that were never built are
+        copied from the JSON file as they are.
+        """
+        if len(self.__fragments) > len(FileStorage.__objects):
+            self.__fragments = {k: v for k, v in self.__fragments.items()
+                                if k in FileStorage.__objects}
+        if keys is None:
+            items = FileStorage.__objects.items()
+        else:
+            items = ((k, FileStorage.__objects[k]) for k in keys)
+        entries = [(k,) + self.__fragment(k, v) for k, v in items]
+        if self.__offsets:
+            with open(self.__path, "rb") as f:
+                for key, (offset, length) in sorted(self.__offsets.items(),
+                                                    key=lambda i: i[1]):
+                    f.seek(offset)
+                    text = f.read(length).decode("utf-8")
+                    entries.append((key, json.dumps(key), text))
+        return entries
+
+    def __snapshot_job(self):
+        """Encodes __objects and returns the job writing them to the JSON
+        file, with the set of paths it rewrites.
+
+        The job writes a temporary sibling, then renames it over the JSON
+        file and discards the journal it supersedes. In sharded mode it
+        does so for each shard holding a changed object.
+        """
+        if self.__shards is None:
+            targets = [(self.__path, None)]
+        else:
+            targets = [(self.__shard_path(shard), keys)
+                       for shard, keys in self.__changed_shards().items()]
+        files, offsets = [], {}
+        for path, keys in targets:
+            if self.__binary:
+                parts = [self.__encode_binary(keys)]
+            else:
+                parts, offsets = self.__encode_json(keys)
+            files.append((path, parts))
+        self.__saved = FileStorage.__objects
+        self.__journal_size = 0
+
+        def write():
+            for path, parts in files:
+                temp_path = "{}.{}.tmp".format(path, os.getpid())
+                try:
+                    with open(temp_path, "wb") as f:
+                        f.writelines(parts)
+                        self.__sync_file(f)
+                    with self.__file_lock:
+                        os.replace(temp_path, path)
+                        self.__offsets = {k: v for k, v in offsets.items()
+                                          if k in self.__offsets}
+                except BaseException:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+            self.__sync_dir(self.__path)
+            if os.path.isfile(self.__journal_path()):
+                os.remove(self.__journal_path())
+        return write, frozenset(path for path, _ in files)
+
+    def __shard(self, key):
+        """Returns the shard a key belongs to."""
+        name, id = key.split(".", 1)
+        if self.__shards == "class":
+            return name
+        return zlib.crc32(id.encode("utf-8")) % self.__shards
+
+    def __shard_path(self, shard):
+        """Returns the path of the file holding a shard."""
+        root, extension = os.path.splitext(self.__path)
+        return "{}.{}{}".format(root, shard, extension)
+
+    def __shard_paths(self):
+        """Returns the paths of every shard file."""
+        if self.__shards == "class":
+            return [self.__shard_path(name) for name in self.classes()]
+        return [self.__shard_path(i) for i in range(self.__shards)]
+
+    def __changed_shards(self):
+        """Returns the keys of each shard holding an object changed since the
+        last save, or of every shard if __objects was replaced since then.
+        """
+        if self.__saved is not FileStorage.__objects:
+            if self.__shards == "class":
+                shards = set(self.classes())
+            else:
+                shards = set(range(self.__shards))
+        else:
+            shards = {self.__shard(key) for key in self.__dirty}
+        if self.__shards == "class":
+            return {name: list(self.__bucket(name)) for name in shards}
+        groups = {shard: [] for shard in shards}
+        for key in FileStorage.__objects:
+            group = groups.get(self.__shard(key))
+            if group is not None:
+                group.append(key)
+        return groups
+
+    def __encode_binary(self, keys=None):
+        """Returns the binary snapshot of __objects, or of the objects under keys.
+
+        Records of objects that are not dirty are reused from the last save.
+        """
+        if keys is None:
+            items = FileStorage.__objects.items()
+        else:
+            items = ((k, FileStorage.__objects[k]) for k in keys)
+        records = []
+        for key, obj in items:
+            cached = self.__records.get(key)
+            if cached is None or cached[0] is not obj:
+                cached = (obj, snapshot.encode(obj.to_dict(), self.__tags))
+                self.__records[key] = cached
+            records.append(cached[1])
+        if len(self.__records) > len(FileStorage.__objects):
+            self.__records = {k: v for k, v in self.__records.items()
+                              if k in FileStorage.__objects}
+        return snapshot.dumps(records, self.__tags)
+
+    def __encode_json(self, keys=None):
+        """Returns the JSON file chunks of __objects, or of the objects under
+        keys, and the new value offsets.
+        """
+        with self.__file_lock:
+            entries = self.__encode(keys)
+        parts = [b"{\n"]
+        position = 2
+        offsets = {}
+        for i, (key, key_text, value_text) in enumerate(entries):
+            head = (key_text + ": ").encode("utf-8")
+            value = value_text.encode("utf-8")
+            tail = b",\n" if i < len(entries) - 1 else b"\n"
+            if key in self.__offsets:
+                offsets[key] = (position + len(head), len(value))
+            parts.append(head + value + tail)
+            position += len(head) + len(value) + len(tail)
+        parts.append(b"}")
+        return parts, offsets
+
+    def __journal_job(self):
+        """Encodes the changed objects and returns the job journaling them."""
+        lines = []
+        for key, obj in self.__dirty.items():
+            if obj is None:
+                key_text, value_text = json.dumps(key), "null"
+            else:
+                key_text, value_text = self.__fragment(key, obj)
+            lines.append('{{"key": {}, "value": {}}}\n'.format(key_text, value_text))
+        self.__journal_size += len(lines)
+
+        def write():
+            with open(self.__journal_path(), "a", encoding="utf-8") as f:
+                f.writelines(lines)
+                self.__sync_file(f)
+        return write
+
+    def __sync_file(self, f):
+        """Flushes f to disk unless durability is "none"."""
+        if self.__durability != "none":
+            f.flush()
+            os.fsync(f.fileno())
+
+    def __sync_dir(self, path):
+        """Flushes the directory entry of path to disk if durability is "dir"."""
+        if self.__durability != "dir":
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def __index(self):
+        """Maps each key of the JSON file to the offset and length of its value.
+
+        Returns None when the file is not laid out one object per line.
+        """
+        offsets = {}
+        with open(self.__path, "rb") as f:
+            position = len(f.readline())
+            if position != 2:
+                return None
+            for line in f:
+                if line.rstrip() == b"}":
+                    return offsets
+                try:
+                    end = line.index(b'": ') + 1
+                    key = json.loads(line[:end])
+                except ValueError:
+                    return None
+                tail = 2 if line.endswith(b",\n") else 1
+                offsets[key] = (position + end + 2, len(line) - end - 2 - tail)
+                position += len(line)
+        return None
+
+    def __materialize(self, keys):
+        """Builds the objects stored under keys from their JSON file lines."""
+        classes = self.classes()
+        with self.__file_lock, open(self.__path, "rb") as f:
+            keys = [k for k in keys if k in self.__offsets]
+            for key in sorted(keys, key=self.__offsets.get):
+                offset, length = self.__offsets.pop(key)
+                f.seek(offset)
+                text = f.read(length).decode("utf-8")
+                value = json.loads(text)
+                obj = classes[value["__class__"]](**value)
+                FileStorage.__objects[key] = obj
+                self.__fragments[key] = (obj, json.dumps(key), text)
 
     def classes(self):
         """Returns a dictionary of valid classes and their references."""
-        from models.base_model import BaseModel
-        from models.user import User
-        from models.state import State
-        from models.city import City
-        from models.amenity import Amenity
-        from models.place import Place
-        from models.review import Review
-
-        return {
-            "BaseModel": BaseModel,
-            "User": User,
-            "State": State,
-            "City": City,
-            "Amenity": Amenity,
-            "Place": Place,
-            "Review": Review
-        }
+        classes = super().classes()
+        if not self.__compact:
+            return classes
+        if self.__compact_classes is None or len(self.__compact_classes) != len(classes):
+            from models.base_model import compact_class
+
+            attributes = self.attributes()
+            compact_classes = self.__compact_classes or {}
+            self.__compact_classes = {
+                name: compact_classes.get(name) or compact_class(cls, dict.fromkeys(
+                    list(attributes["BaseModel"]) + list(attributes[name])))
+                for name, cls in classes.items()
+            }
+        return self.__compact_classes
+
+    def __load(self, path, classes):
+        """Returns the objects stored in the JSON file or snapshot at path."""
+        if not os.path.isfile(path):
+            return {}
+        if self.__binary:
+            with open(path, "rb") as f:
+                return {key: classes[name](**kwargs)
+                        for key, name, kwargs in snapshot.load(f)}
+        with open(path, "r", encoding="utf-8") as f:
+            return {k: classes[v["__class__"]](**v)
+                    for k, v in json.load(f).items()}
+
+    def __tasks(self):
+        """Returns the _decode() tasks covering the stored files.
+
+        A JSON file laid out one object per line is cut at line boundaries
+        into one byte range per worker; any other file is a single task.
+        """
+        if self.__shards is not None:
+            return [(path, self.__binary, None, None)
+                    for path in self.__shard_paths() if os.path.isfile(path)]
+        if not os.path.isfile(self.__path):
+            return []
+        whole = [(self.__path, self.__binary, None, None)]
+        if self.__binary:
+            return whole
+        with open(self.__path, "rb") as f:
+            end = os.fstat(f.fileno()).st_size - 1
+            if end < 2:
+                return whole
+            f.seek(end)
+            if f.read() != b"}":
+                return whole
+            f.seek(0)
+            if f.readline() != b"{\n":
+                return whole
+            start = f.tell()
+            step = max(1, (end - start) // self.__workers)
+            tasks = []
+            while start < end:
+                f.seek(min(start + step, end))
+                f.readline()
+                stop = min(f.tell(), end)
+                tasks.append((self.__path, False, start, stop))
+                start = stop
+        return tasks
+
+    def __decode_forked(self, tasks):
+        """Yields the _decode() result of each task, in order, from forked
+        worker processes each decoding a run of the tasks.
+
+        The workers are plain processes rather than a pool, since a pool
+        pickles _decode from a feeder thread, which waits forever on the
+        models package while importing it runs reload().
+        """
+        if not tasks:
+            return
+        size = -(-len(tasks) // min(self.__workers, len(tasks)))
+        workers = []
+        try:
+            for start in range(0, len(tasks), size):
+                receiver, sender = _FORK.Pipe(duplex=False)
+                process = _FORK.Process(target=_decode_all, daemon=True,
+                                        args=(tasks[start:start + size], sender))
+                process.start()
+                sender.close()
+                workers.append((process, receiver))
+            for _, receiver in workers:
+                result = receiver.recv()
+                if isinstance(result, Exception):
+                    raise result
+                yield from result
+        finally:
+            for process, receiver in workers:
+                receiver.close()
+                process.join()
+
+    def __load_files(self, classes):
+        """Builds the objects stored in the file or shards.
+
+        Returns:
+            (objects by key, offsets of the objects left unbuilt or None)
+        """
+        obj_dict, offsets = {}, None
+        if self.__workers > 1 and not self.__lazy and _FORK is not None:
+            for decoded in self.__decode_forked(self.__tasks()):
+                for key, name, kwargs in decoded:
+                    obj_dict[key] = classes[name](**kwargs)
+        elif self.__shards is not None:
+            with ThreadPoolExecutor() as pool:
+                for objects in pool.map(lambda path: self.__load(path, classes),
+                                        self.__shard_paths()):
+                    obj_dict.update(objects)
+        elif os.path.isfile(self.__path):
+            if self.__lazy and not self.__binary:
+                offsets = self.__index()
+            if offsets is None:
+                obj_dict = self.__load(self.__path, classes)
+        return obj_dict, offsets
 
     def reload(self):
-        """Loads stored objects from the JSON file."""
-        if not os.path.isfile(FileStorage.__file_path):
+        """Loads stored objects from the file and replays the journal."""
+        self.__drain()
+        classes = self.classes()
+        with self.__locked(exclusive=False), _gc_paused():
+            obj_dict, offsets = self.__load_files(classes)
+            offsets = offsets or {}
+            records = self.__read_journal()
+            if self.__shared:
+                self.__stamp = self.__stamps()
+        for key, value in records:
+            offsets.pop(key, None)
+            if value is None:
+                obj_dict.pop(key, None)
+            else:
+                obj_dict[key] = classes[value["__class__"]](**value)
+        self.__journal_size = len(records)
+        FileStorage.__objects = obj_dict
+        self.__saved = obj_dict
+        self.__offsets = offsets
+        self.__dirty = {}
+        if self.__changes is not None:
+            self.__changes = {}
+        self.__fragments = {}
+        self.__records = {}
+        self.__reindex()
+
+    def __read_journal(self, start=0):
+        """Returns the (key, value) records of the journal from offset start.
+
+        Reading stops at a torn final record left by an interrupted append,
+        which is cut off so that the next append starts on a line of its own.
+        """
+        records = []
+        path = self.__journal_path()
+        if not os.path.isfile(path):
+            return records
+        with open(path, "rb") as f:
+            f.seek(start)
+            end = start
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("torn record")
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn final record from an interrupted append
+                records.append((record["key"], record["value"]))
+                end += len(line)
+            torn = f.seek(0, os.SEEK_END) > end
+        if torn:
+            os.truncate(path, end)
+        return records
+
+    def refresh(self):
+        """Loads the objects other processes saved since this one last read
+        or wrote the files, keeping unsaved changes.
+
+        Returns:
+            True if another process had saved, False otherwise
+        """
+        if not self.__shared:
+            return False
+        with self.__locked(exclusive=False):
+            return self.__merge()
+
+    @contextlib.contextmanager
+    def __locked(self, exclusive):
+        """Holds the advisory lock shared by the processes using the files.
+
+        Does nothing outside shared mode or where advisory locks are missing.
+        """
+        if not self.__shared or fcntl is None:
+            yield
             return
-        with open(FileStorage.__file_path, "r", encoding="utf-8") as f:
-            obj_dict = json.load(f)
-            obj_dict = {k: self.classes()[v["__class__"]](**v) for k, v in obj_dict.items()}
-            FileStorage.__objects = obj_dict
-
-    def attributes(self):
-        """Returns the valid attributes and their types for each class."""
-        return {
-            "BaseModel": {
-                "id": str,
-                "created_at": datetime.datetime,
-                "updated_at": datetime.datetime
-            },
-            "User": {
-                "email": str,
-                "password": str,
-                "first_name": str,
-                "last_name": str
-            },
-            "State": {
-                "name": str
-            },
-            "City": {
-                "state_id": str,
-                "name": str
-            },
-            "Amenity": {
-                "name": str
-            },
-            "Place": {
-                "city_id": str,
-                "user_id": str,
-                "name": str,
-                "description": str,
-                "number_rooms": int,
-                "number_bathrooms": int,
-                "max_guest": int,
-                "price_by_night": int,
-                "latitude": float,
-                "longitude": float,
-                "amenity_ids": list
-            },
-            "Review": {
-                "place_id": str,
-                "user_id": str,
-                "text": str
-            }
-        }
+        with open(self.__path + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def __stamps(self):
+        """Returns the (inode, size, mtime) stamp of each file of the store,
+        or None for those missing.
+        """
+        if self.__shards is None:
+            paths = [self.__path, self.__journal_path()]
+        else:
+            paths = self.__shard_paths()
+        stamps = {}
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                stamps[path] = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            except FileNotFoundError:
+                stamps[path] = None
+        return stamps
+
+    def __merge(self):
+        """Loads the changes other processes saved to the files since their
+        last stamp; the lock must be held.
+
+        Returns:
+            True if a file had changed, False otherwise
+        """
+        stamps = self.__stamps()
+        changed = [path for path, stamp in stamps.items()
+                   if stamp != self.__stamp.get(path)]
+        if not changed:
+            return False
+        classes = self.classes()
+        if self.__indexed is not FileStorage.__objects:
+            self.__reindex()
+        journal = self.__journal_path()
+        old = self.__stamp.get(journal)
+        if self.__shards is not None:
+            ours = {}
+            for key in FileStorage.__objects:
+                ours.setdefault(str(self.__shard(key)), set()).add(key)
+            for path in changed:
+                shard = os.path.splitext(path)[0].rsplit(".", 1)[1]
+                objects = self.__load(path, classes)
+                self.__update(objects, set(objects) | ours.get(shard, set()))
+        elif changed == [journal] and stamps[journal] \
+                and (old is None or stamps[journal][0] == old[0]
+                     and stamps[journal][1] > old[1]):
+            records = self.__read_journal(old[1] if old else 0)
+            self.__update({key: value and classes[value["__class__"]](**value)
+                           for key, value in records})
+            self.__journal_size += len(records)
+        else:
+            with _gc_paused():
+                objects = self.__load(self.__path, classes)
+                records = self.__read_journal()
+                for key, value in records:
+                    if value is None:
+                        objects.pop(key, None)
+                    else:
+                        objects[key] = classes[value["__class__"]](**value)
+            for key, obj in self.__dirty.items():
+                if obj is None:
+                    objects.pop(key, None)
+                else:
+                    objects[key] = obj
+            FileStorage.__objects = objects
+            self.__saved = objects
+            self.__fragments = {}
+            self.__records = {}
+            self.__reindex()
+            self.__journal_size = len(records)
+        self.__stamp = self.__stamps()
+        self.__generation += 1
+        return True
+
+    def __update(self, objects, keys=None):
+        """Replaces the stored objects under keys (by default those of
+        objects) by the objects saved by another process.
 
+        A key missing from objects is removed. Keys with unsaved changes,
+        and objects whose fields are unchanged, are left as they are.
+        """
+        for key in objects if keys is None else keys:
+            if key in self.__dirty:
+                continue
+            obj = objects.get(key)
+            current = FileStorage.__objects.get(key)
+            if obj is None and current is None:
+                continue
+            if obj is not None and current is not None \
+                    and obj.to_dict() == current.to_dict():
+                continue
+            name = key.split(".", 1)[0]
+            self.__fragments.pop(key, None)
+            self.__records.pop(key, None)
+            if obj is None:
+                del FileStorage.__objects[key]
+                self.__classes.get(name, set()).discard(key)
+                if self.__index_values is not None:
+                    self.__unindex_object(key)
+                if self.__orders:
+                    self.__unsort_object(key)
+            else:
+                FileStorage.__objects[key] = obj
+                self.__classes.setdefault(name, set()).add(key)
+                if self.__index_values is not None:
+                    self.__index_object(key, obj)
+                if self.__orders:
+                    self.__sort_object(key, obj)
@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+"""Defines the MappedStorage class."""
+import json
+import os
+from models.engine.base_storage import BaseStorage
+from models.engine.snapshot import MappedSnapshot
+
+
+class MappedStorage(BaseStorage):
+    """Read-only storage over a memory-mapped snapshot.
+
+    reload() only maps the file, so opening a store takes the same time
+    whatever its size, and the operating system shares its pages between
+    every process reading it. An object is decoded the first time it is
+    read and then kept in an identity map. Keys are sorted in the file,
+    so the objects of one class are contiguous and count(cls) is two
+    binary searches. The store is read-only: new(), delete(), save() and
+    assignments to the attributes of stored objects raise PermissionError.
+    Mapped snapshots are written with snapshot.convert(); while the file
+    is missing, the store is empty.
+    """
+
+    def __init__(self, path="file.map"):
+        """Initializes the storage settings.
+
+        Args:
+            - path: path of the mapped snapshot file
+        """
+        super().__init__()
+        self.__path = path
+        self.__snapshot = None
+        self.__objects = {}
+        self.__generation = 0
+
+    def all(self, cls=None):
+        """Returns a dictionary of every stored object, or only those of cls."""
+        if self.__snapshot is None:
+            return {}
+        if cls is None:
+            span = self.__snapshot.span()
+        else:
+            span = self.__snapshot.span(self.__prefix(cls))
+        return {key: self.__object(key, value)
+                for key, value in self.__snapshot.items(*span)}
+
+    def count(self, cls=None):
+        """Returns the number of stored objects, or of objects of cls."""
+        if self.__snapshot is None:
+            return 0
+        if cls is None:
+            return len(self.__snapshot)
+        start, stop = self.__snapshot.span(self.__prefix(cls))
+        return stop - start
+
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None."""
+        key = "{}{}".format(self.__prefix(cls), id)
+        if key in self.__objects:
+            return self.__objects[key]
+        if self.__snapshot is None:
+            return None
+        value = self.__snapshot.get(key)
+        return None if value is None else self.__object(key, value)
+
+    def new(self, obj):
+        """Refuses to add an object to the read-only storage."""
+        raise PermissionError("{} is a read-only snapshot".format(self.__path))
+
+    def delete(self, obj=None):
+        """Refuses to remove an object from the read-only storage."""
+        if obj is not None:
+            raise PermissionError("{} is a read-only snapshot".format(self.__path))
+
+    def touch(self, obj, name=None):
+        """Refuses to change an object of the read-only storage."""
+        key = "{}.{}".format(type(obj).__name__, getattr(obj, "id", None))
+        if self.__objects.get(key) is obj:
+            raise PermissionError("{} is a read-only snapshot".format(self.__path))
+
+    def generation(self):
+        """Returns a counter that changes whenever the snapshot is remapped."""
+        return self.__generation
+
+    def save(self):
+        """Refuses to write the read-only storage."""
+        raise PermissionError("{} is a read-only snapshot".format(self.__path))
+
+    def close(self):
+        """Unmaps the snapshot."""
+        if self.__snapshot is not None:
+            self.__snapshot.close()
+            self.__snapshot = None
+
+    def reload(self):
+        """Maps the snapshot file again and forgets the decoded objects."""
+        snapshot = None
+        if os.path.isfile(self.__path):
+            snapshot = MappedSnapshot(self.__path)
+        self.close()
+        self.__snapshot = snapshot
+        self.__objects = {}
+        self.__generation += 1
+
+    @staticmethod
+    def __prefix(cls):
+        """Returns the key prefix of the objects of cls."""
+        return "{}.".format(cls if isinstance(cls, str) else cls.__name__)
+
+    def __object(self, key, value):
+        """Returns the object stored under key, decoding value if needed."""
+        obj = self.__objects.get(key)
+        if obj is None:
+            kwargs = json.loads(value)
+            obj = self.classes()[kwargs["__class__"]](**kwargs)
+            self.__objects[key] = obj
+        return obj
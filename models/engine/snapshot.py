@@ -0,0 +1,219 @@
+#!/usr/bin/python3
+"""Binary snapshot formats for the storage engines.
+
+A binary snapshot is the MAGIC header followed by a pickle (protocol 5)
+of (class names, records). Each record is the tuple
+(class tag, id, created_at, updated_at, other attributes or None), where
+the class tag indexes the class names and both timestamps are integer
+microseconds since 1970-01-01. Snapshots only hold plain values and are
+read back with an unpickler that refuses to import anything.
+
+A mapped snapshot (".map") is laid out for read-only use through mmap:
+a header holding MAPPED_MAGIC and the number of objects, then one
+fixed-size ENTRY (offset, key length, value length) per object sorted by
+key, then the records themselves, each being the UTF-8 key followed by
+the to_dict() JSON. Opening one costs the same whatever its size, a key
+is found by binary search over the entries, and only the records that
+are read get decoded; the pages are shared by every process mapping it.
+
+Stores are converted between the formats with convert(), or from the
+command line with models.engine.convert.
+"""
+import json
+import mmap
+import os
+import pickle
+import struct
+from datetime import datetime, timedelta
+
+MAGIC = b"HBNB\x01"
+EXTENSION = ".bin"
+MAPPED_MAGIC = b"HBNBMAP1"
+MAPPED_EXTENSION = ".map"
+HEADER = struct.Struct("<8sQ")
+ENTRY = struct.Struct("<QII")
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class _Unpickler(pickle.Unpickler):
+    """Unpickler that only accepts built-in containers and scalars."""
+
+    def find_class(self, module, name):
+        """Refuses every global reference."""
+        raise pickle.UnpicklingError("global '{}.{}' is forbidden".format(module, name))
+
+
+def is_snapshot(path):
+    """Tells whether path names a binary snapshot rather than a JSON file."""
+    return path.endswith(EXTENSION)
+
+
+def encode(value, tags):
+    """Returns the record of a to_dict() dictionary.
+
+    Args:
+        - value: the dictionary returned by to_dict()
+        - tags: dictionary of class name to tag, extended as needed
+    """
+    from models.base_model import parse_datetime
+
+    extra = dict(value)
+    name = extra.pop("__class__")
+    tag = tags.setdefault(name, len(tags))
+    created_at = (parse_datetime(extra.pop("created_at")) - EPOCH) // MICROSECOND
+    updated_at = (parse_datetime(extra.pop("updated_at")) - EPOCH) // MICROSECOND
+    return (tag, extra.pop("id"), created_at, updated_at, extra or None)
+
+
+def decode(record, names):
+    """Returns (key, keyword arguments for the model class) of a record."""
+    tag, id, created_at, updated_at, extra = record
+    kwargs = dict(extra) if extra else {}
+    kwargs["id"] = id
+    kwargs["created_at"] = EPOCH + created_at * MICROSECOND
+    kwargs["updated_at"] = EPOCH + updated_at * MICROSECOND
+    return "{}.{}".format(names[tag], id), names[tag], kwargs
+
+
+def dumps(records, tags):
+    """Returns the snapshot bytes of records encoded with tags."""
+    names = [None] * len(tags)
+    for name, tag in tags.items():
+        names[tag] = name
+    return MAGIC + pickle.dumps((names, records), protocol=5)
+
+
+def load(f):
+    """Reads a snapshot from the binary file f.
+
+    Returns:
+        a list of (key, class name, keyword arguments) tuples
+    """
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a binary snapshot")
+    names, records = _Unpickler(f).load()
+    return [decode(record, names) for record in records]
+
+
+def write_mapped(path, items):
+    """Writes a mapped snapshot of (key, to_dict() JSON text) items to path."""
+    items = sorted((key.encode("utf-8"), value.encode("utf-8"))
+                   for key, value in items)
+    temp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAPPED_MAGIC, len(items)))
+        offset = HEADER.size + ENTRY.size * len(items)
+        for key, value in items:
+            f.write(ENTRY.pack(offset, len(key), len(value)))
+            offset += len(key) + len(value)
+        for key, value in items:
+            f.write(key)
+            f.write(value)
+    os.replace(temp_path, path)
+
+
+class MappedSnapshot:
+    """Read-only view of a mapped snapshot file."""
+
+    def __init__(self, path):
+        """Maps the snapshot at path into memory."""
+        with open(path, "rb") as f:
+            self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.__count = HEADER.unpack_from(self.__map, 0)
+        if magic != MAPPED_MAGIC:
+            self.__map.close()
+            raise ValueError("not a mapped snapshot")
+
+    def __len__(self):
+        """Returns the number of objects in the snapshot."""
+        return self.__count
+
+    def close(self):
+        """Unmaps the snapshot."""
+        self.__map.close()
+
+    def get(self, key):
+        """Returns the to_dict() JSON bytes stored under key, or None."""
+        key = key.encode("utf-8")
+        i = self.__bisect(key)
+        if i < self.__count and self.__key(i) == key:
+            offset, key_length, value_length = self.__entry(i)
+            return self.__map[offset + key_length:offset + key_length + value_length]
+        return None
+
+    def span(self, prefix=""):
+        """Returns the (start, stop) positions of the keys starting with prefix."""
+        if not prefix:
+            return 0, self.__count
+        prefix = prefix.encode("utf-8")
+        end = prefix[:-1] + bytes([prefix[-1] + 1])
+        return self.__bisect(prefix), self.__bisect(end)
+
+    def items(self, start=0, stop=None):
+        """Yields the (key, to_dict() JSON bytes) pairs between two positions."""
+        for i in range(start, self.__count if stop is None else stop):
+            offset, key_length, value_length = self.__entry(i)
+            middle = offset + key_length
+            yield (self.__map[offset:middle].decode("utf-8"),
+                   self.__map[middle:middle + value_length])
+
+    def __entry(self, i):
+        """Returns the (offset, key length, value length) of position i."""
+        return ENTRY.unpack_from(self.__map, HEADER.size + i * ENTRY.size)
+
+    def __key(self, i):
+        """Returns the key bytes at position i."""
+        offset, key_length, _ = self.__entry(i)
+        return self.__map[offset:offset + key_length]
+
+    def __bisect(self, key):
+        """Returns the first position whose key is not below key."""
+        low, high = 0, self.__count
+        while low < high:
+            middle = (low + high) // 2
+            if self.__key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+def read(path):
+    """Returns the to_dict() dictionaries stored in a file of any format."""
+    if path.endswith(MAPPED_EXTENSION):
+        mapped = MappedSnapshot(path)
+        try:
+            return {key: json.loads(value) for key, value in mapped.items()}
+        finally:
+            mapped.close()
+    if is_snapshot(path):
+        objects = {}
+        with open(path, "rb") as f:
+            for key, name, kwargs in load(f):
+                value = dict(kwargs, __class__=name)
+                value["created_at"] = value["created_at"].isoformat()
+                value["updated_at"] = value["updated_at"].isoformat()
+                objects[key] = value
+        return objects
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write(path, objects):
+    """Writes to_dict() dictionaries to a file in the format of its extension."""
+    if path.endswith(MAPPED_EXTENSION):
+        write_mapped(path, ((k, json.dumps(v)) for k, v in objects.items()))
+    elif is_snapshot(path):
+        tags = {}
+        records = [encode(value, tags) for value in objects.values()]
+        with open(path, "wb") as f:
+            f.write(dumps(records, tags))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(objects, f)
+
+
+def convert(source, destination):
+    """Converts a store between the JSON, binary and mapped formats."""
+    write(destination, read(source))
@@ -0,0 +1,225 @@
+#!/usr/bin/python3
+"""Defines the SQLiteStorage class."""
+import contextlib
+import json
+import sqlite3
+from models.engine.base_storage import BaseStorage
+
+
+class SQLiteStorage(BaseStorage):
+    """Handles storing and retrieving data in a SQLite database.
+
+    Each class gets a table keyed by id, with one column per attribute
+    declared in attributes() and an "extra" column holding any other
+    attributes as JSON. Objects read from the database are kept in an
+    identity map. save() writes only the changed objects, as row upserts
+    and deletes; reads first apply pending changes inside the open
+    transaction so they always see them.
+    """
+
+    TYPES = {str: "TEXT", int: "INTEGER", float: "REAL"}
+
+    def __init__(self, path="file.db"):
+        """Initializes the storage settings.
+
+        Args:
+            - path: path of the SQLite database file
+        """
+        super().__init__()
+        self.__path = path
+        self.__connection = None
+        self.__objects = {}
+        self.__dirty = {}
+        self.__generation = 0
+        self.__batch_depth = 0
+        self.__deferred = False
+
+    def all(self, cls=None):
+        """Returns a dictionary of every stored object, or only those of cls."""
+        if cls is None:
+            names = list(self.classes())
+        else:
+            names = [cls if isinstance(cls, str) else cls.__name__]
+        self.__apply()
+        objects = {}
+        for name in names:
+            if name not in self.classes():
+                continue
+            for row in self.__connection.execute(
+                    'SELECT {} FROM "{}"'.format(self.__columns(name), name)):
+                key = "{}.{}".format(name, row[0])
+                obj = self.__objects.get(key)
+                objects[key] = obj if obj is not None else self.__build(name, row)
+        return objects
+
+    def count(self, cls=None):
+        """Returns the number of stored objects, or of objects of cls."""
+        if cls is None:
+            names = list(self.classes())
+        else:
+            names = [cls if isinstance(cls, str) else cls.__name__]
+        self.__apply()
+        return sum(self.__connection.execute(
+            'SELECT COUNT(*) FROM "{}"'.format(name)).fetchone()[0]
+            for name in names if name in self.classes())
+
+    def get(self, cls, id):
+        """Returns the object of class cls with the given id, or None."""
+        name = cls if isinstance(cls, str) else cls.__name__
+        key = "{}.{}".format(name, id)
+        if key in self.__dirty:
+            return self.__dirty[key]
+        if key in self.__objects:
+            return self.__objects[key]
+        if name not in self.classes():
+            return None
+        row = self.__connection.execute(
+            'SELECT {} FROM "{}" WHERE id = ?'.format(self.__columns(name), name),
+            (id,)).fetchone()
+        return self.__build(name, row) if row else None
+
+    def new(self, obj):
+        """Adds an object to the storage."""
+        key = "{}.{}".format(type(obj).__name__, obj.id)
+        self.__objects[key] = obj
+        self.__dirty[key] = obj
+        self.__generation += 1
+
+    def delete(self, obj=None):
+        """Removes an object from the storage if it is present."""
+        if obj is None:
+            return
+        key = "{}.{}".format(type(obj).__name__, obj.id)
+        self.__objects.pop(key, None)
+        self.__dirty[key] = None
+        self.__generation += 1
+
+    def touch(self, obj, name=None):
+        """Flags a stored object as changed since the last save."""
+        key = "{}.{}".format(type(obj).__name__, getattr(obj, "id", None))
+        if self.__objects.get(key) is obj:
+            self.__dirty[key] = obj
+            self.__generation += 1
+
+    def generation(self):
+        """Returns a counter that changes whenever stored objects change."""
+        return self.__generation
+
+    def save(self):
+        """Writes the changed objects and commits them."""
+        if self.__batch_depth:
+            self.__deferred = True
+            return
+        self.__apply()
+        if self.__connection.in_transaction:
+            self.__connection.execute("COMMIT")
+        self.__deferred = False
+
+    def flush(self):
+        """Commits a save deferred by batch()."""
+        if self.__deferred:
+            self.save()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Defers every save() until the outermost batch exits.
+
+        The block's changes are then committed once. If the block raises,
+        nothing is committed and the changes stay pending for the next save.
+        """
+        self.__batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.__batch_depth -= 1
+        if not self.__batch_depth:
+            self.flush()
+
+    def reload(self):
+        """Drops unsaved changes, creates any missing class table and adds
+        the columns of attributes declared since a table was created.
+        """
+        if self.__connection is None:
+            self.__connection = sqlite3.connect(self.__path, isolation_level=None)
+        elif self.__connection.in_transaction:
+            self.__connection.execute("ROLLBACK")
+        for name in self.classes():
+            columns = ['"{}" {}'.format(field, self.TYPES.get(kind, "TEXT"))
+                       for field, kind in self.__fields(name)]
+            columns[0] += " PRIMARY KEY"
+            self.__connection.execute('CREATE TABLE IF NOT EXISTS "{}" ({}, extra TEXT)'.format(
+                name, ", ".join(columns)))
+            existing = {row[1] for row in self.__connection.execute(
+                'PRAGMA table_info("{}")'.format(name))}
+            for field, kind in self.__fields(name):
+                if field not in existing:
+                    self.__connection.execute('ALTER TABLE "{}" ADD COLUMN "{}" {}'.format(
+                        name, field, self.TYPES.get(kind, "TEXT")))
+        self.__objects = {}
+        self.__dirty = {}
+        self.__deferred = False
+        self.__generation += 1
+
+    def __fields(self, name):
+        """Returns the (attribute, type) pairs stored in the columns of name."""
+        attributes = self.attributes()
+        fields = dict(attributes["BaseModel"])
+        fields.update(attributes.get(name, {}))
+        return list(fields.items())
+
+    def __columns(self, name):
+        """Returns the column list of the table of name, in row order."""
+        return ", ".join(['"{}"'.format(field) for field, _ in self.__fields(name)]
+                         + ["extra"])
+
+    def __build(self, name, row):
+        """Returns the object of class name stored in a table row."""
+        fields = self.__fields(name)
+        kwargs = {}
+        for (field, kind), value in zip(fields, row):
+            if value is not None:
+                kwargs[field] = json.loads(value) if kind is list else value
+        if row[len(fields)]:
+            kwargs.update(json.loads(row[len(fields)]))
+        obj = self.classes()[name](**kwargs)
+        self.__objects["{}.{}".format(name, obj.id)] = obj
+        return obj
+
+    def __row(self, obj):
+        """Returns the table row values of an object."""
+        values = obj.to_dict()
+        del values["__class__"]
+        row = []
+        for field, kind in self.__fields(type(obj).__name__):
+            value = values.get(field)
+            if kind is list and isinstance(value, list):
+                value = json.dumps(value)
+            elif value is not None and not isinstance(value, (str, int, float)):
+                row.append(None)
+                continue
+            values.pop(field, None)
+            row.append(value)
+        row.append(json.dumps(values) if values else None)
+        return row
+
+    def __apply(self):
+        """Executes the pending row changes inside the open transaction."""
+        if not self.__dirty:
+            return
+        upserts, deletes = {}, {}
+        for key, obj in self.__dirty.items():
+            name, id = key.split(".", 1)
+            if obj is None:
+                deletes.setdefault(name, []).append((id,))
+            else:
+                upserts.setdefault(name, []).append(self.__row(obj))
+        if not self.__connection.in_transaction:
+            self.__connection.execute("BEGIN")
+        for name, ids in deletes.items():
+            self.__connection.executemany(
+                'DELETE FROM "{}" WHERE id = ?'.format(name), ids)
+        for name, rows in upserts.items():
+            self.__connection.executemany(
+                'INSERT OR REPLACE INTO "{}" ({}) VALUES ({})'.format(
+                    name, self.__columns(name), ", ".join("?" * len(rows[0]))), rows)
+        self.__dirty = {}
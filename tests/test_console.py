@@ -1,5 +1,5 @@
 #!/usr/bin/python3
-"""Establishes unit tests for console.py."""
+"""Establishes unit tests for console.py.
 
 Unittest classes:
     TestHBNBCommand_help
@@ -10,12 +10,28 @@ Unittest classes:
     TestHBNBCommand_update
     TestHBNBCommand_show
     TestHBNBCommand_all
+    TestHBNBCommand_bulk_update
+    TestHBNBCommand_where
+    TestHBNBCommand_all_streaming
+    TestHBNBCommand_all_pages
+    TestHBNBCommand_changes
+    TestHBNBCommand_refresh
+    TestHBNBCommand_read_only
+    TestHBNBCommand_group_commit
 """
 import os
 import sys
+import json
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 from models import storage
+from models.user import User
+from models.engine import snapshot
 from models.engine.file_storage import FileStorage
+from models.engine.mapped_storage import MappedStorage
 from console import HBNBCommand
 from io import StringIO
 from unittest.mock import patch
@@ -24,9 +40,8 @@ from unittest.mock import patch
 class TestHBNBCommand_prompting(unittest.TestCase):
     """Unittests for testing prompting of the HBNB command interpreter."""
 
-   def test_prompt_string(self):
-    assert HBNBCommand.prompt == "(hbnb) "
-
+    def test_prompt_string(self):
+        self.assertEqual("(hbnb) ", HBNBCommand.prompt)
 
     def test_empty_line(self):
         with patch("sys.stdout", new=StringIO()) as output:
@@ -98,12 +113,13 @@ class TestHBNBCommand_help(unittest.TestCase):
             self.assertEqual(h, output.getvalue().strip())
 
     def test_help(self):
-        h = ("Documented commands (type help <topic>):\n"
-             "========================================\n"
-             "EOF  all  count  create  destroy  help  quit  show  update")
+        commands = ["EOF", "all", "bulk_update", "changes", "count", "create",
+                    "destroy", "help", "quit", "show", "update", "where"]
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("help"))
-            self.assertEqual(h, output.getvalue().strip())
+        header, rule, *rows = output.getvalue().strip().splitlines()
+        self.assertEqual("Documented commands (type help <topic>):", header)
+        self.assertEqual(sorted(commands), sorted(" ".join(rows).split()))
 
 
 class TestHBNBCommand_exit(unittest.TestCase):
@@ -147,10 +163,10 @@ class TestHBNBCommand_create(unittest.TestCase):
             self.assertEqual(correct, output.getvalue().strip())
 
     def test_invalid_class_creation(self):
-    expected_message = "** class doesn't exist **"
-    with patch("sys.stdout", new=StringIO()) as captured_output:
-        self.assertFalse(HBNBCommand().onecmd("create MyModel"))
-        self.assertEqual(expected_message, captured_output.getvalue().strip())
+        expected_message = "** class doesn't exist **"
+        with patch("sys.stdout", new=StringIO()) as captured_output:
+            self.assertFalse(HBNBCommand().onecmd("create MyModel"))
+            self.assertEqual(expected_message, captured_output.getvalue().strip())
 
     def test_create_invalid_syntax(self):
         correct = "*** Unknown syntax: MyModel.create()"
@@ -1501,6 +1517,51 @@ class TestHBNBCommand_update(unittest.TestCase):
         test_dict = storage.all()["Place.{}".format(testId)].__dict__
         self.assertEqual(9.8, test_dict["latitude"])
 
+    def test_update_quoted_int_attr_is_converted(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create Place")
+            testId = output.getvalue().strip()
+        testCmd = 'update Place {} max_guest "98"'.format(testId)
+        self.assertFalse(HBNBCommand().onecmd(testCmd))
+        test_dict = storage.all()["Place.{}".format(testId)].__dict__
+        self.assertEqual(98, test_dict["max_guest"])
+
+    def test_update_invalid_int_attr(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create Place")
+            testId = output.getvalue().strip()
+        correct = "** max_guest must be int, not 'many' **"
+        testCmd = "update Place {} max_guest many".format(testId)
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+            self.assertEqual(correct, output.getvalue().strip())
+        test_dict = storage.all()["Place.{}".format(testId)].__dict__
+        self.assertNotIn("max_guest", test_dict)
+
+    def test_update_invalid_dictionary_is_not_applied(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create Place")
+            testId = output.getvalue().strip()
+        correct = "** latitude must be float, not 'north' **"
+        testCmd = 'Place.update("{}", '.format(testId)
+        testCmd += "{'max_guest': 4, 'latitude': 'north'})"
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+            self.assertEqual(correct, output.getvalue().strip())
+        test_dict = storage.all()["Place.{}".format(testId)].__dict__
+        self.assertNotIn("max_guest", test_dict)
+        self.assertNotIn("latitude", test_dict)
+
+    def test_update_unquoted_str_attr_keeps_text(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create Place")
+            testId = output.getvalue().strip()
+        for attribute, value in (("name", "007"), ("description", "1e3")):
+            testCmd = "update Place {} {} {}".format(testId, attribute, value)
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+            test_dict = storage.all()["Place.{}".format(testId)].__dict__
+            self.assertEqual(value, test_dict[attribute])
+
 
 class TestHBNBCommand_count(unittest.TestCase):
     """Unittests for testing count method of HBNB comand interpreter."""
@@ -1567,6 +1628,380 @@ class TestHBNBCommand_count(unittest.TestCase):
             self.assertEqual("1", output.getvalue().strip())
 
 
+class TestHBNBCommand_bulk_update(unittest.TestCase):
+    """Unittests for testing bulk_update from the HBNB command interpreter."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.ids = []
+        for city_id in ("c1", "c1", "c2"):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create Place")
+            self.ids.append(output.getvalue().strip())
+            HBNBCommand().onecmd('update Place {} city_id "{}"'.format(
+                self.ids[-1], city_id))
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def place(self, uid):
+        return storage.all()["Place.{}".format(uid)]
+
+    def test_bulk_update_filter_space_notation(self):
+        testCmd = 'bulk_update Place {"city_id": "c1"} {"max_guest": "4"}'
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+            self.assertEqual("2", output.getvalue().strip())
+        self.assertEqual(4, self.place(self.ids[0]).max_guest)
+        self.assertEqual(4, self.place(self.ids[1]).max_guest)
+        self.assertNotIn("max_guest", self.place(self.ids[2]).__dict__)
+
+    def test_bulk_update_ids_dot_notation(self):
+        testCmd = 'Place.bulk_update(["{}", "{}", "missing"], {{"name": "Loft"}})'
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(testCmd.format(*self.ids[1:])))
+            self.assertEqual("2", output.getvalue().strip())
+        self.assertEqual("Loft", self.place(self.ids[2]).name)
+        self.assertNotIn("name", self.place(self.ids[0]).__dict__)
+
+    def test_bulk_update_all_saves_once(self):
+        with patch.object(storage, "save") as save:
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("Place.bulk_update({}, {'number_rooms': 2})")
+                self.assertEqual("3", output.getvalue().strip())
+        save.assert_called_once_with()
+        for uid in self.ids:
+            self.assertEqual(2, self.place(uid).number_rooms)
+
+    def test_bulk_update_no_match(self):
+        with patch.object(storage, "save") as save:
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd('bulk_update Place {"city_id": "c9"} {"name": "x"}')
+                self.assertEqual("0", output.getvalue().strip())
+        save.assert_not_called()
+
+    def test_bulk_update_invalid_value(self):
+        correct = "** max_guest must be int, not 'many' **"
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd('bulk_update Place {} {"max_guest": "many"}')
+            self.assertEqual(correct, output.getvalue().strip())
+        self.assertNotIn("max_guest", self.place(self.ids[0]).__dict__)
+
+    def test_bulk_update_errors(self):
+        for testCmd, correct in (("bulk_update", "** class name missing **"),
+                                 ("bulk_update MyModel {} {}", "** class doesn't exist **"),
+                                 ("bulk_update Place", "** filter missing **"),
+                                 ("bulk_update Place {}", "** attributes missing **"),
+                                 ("bulk_update Place {oops} {}", "** invalid arguments **")):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(testCmd))
+                self.assertEqual(correct, output.getvalue().strip())
+
+
+class TestHBNBCommand_where(unittest.TestCase):
+    """Unittests for testing where from the HBNB command interpreter."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        for i in range(4):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create Place")
+            HBNBCommand().onecmd('Place.update("{}", {{"price_by_night": {}, '
+                                 '"name": "P{}"}})'.format(
+                                     output.getvalue().strip(), 50 * i, i))
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def where(self, testCmd):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+        return output.getvalue()
+
+    def test_where_dot_notation(self):
+        found = self.where('Place.where(price_by_night<100, name!="P0")')
+        self.assertEqual(1, found.count("[Place]"))
+        self.assertIn("'name': 'P1'", found)
+
+    def test_where_space_notation(self):
+        self.assertEqual(2, self.where("where Place price_by_night>=100").count("[Place]"))
+
+    def test_where_limit_offset(self):
+        self.assertEqual(2, self.where("Place.where(limit=2)").count("[Place]"))
+        self.assertEqual(1, self.where("Place.where(limit=2, offset=3)").count("[Place]"))
+
+    def test_where_errors(self):
+        for testCmd, correct in (("where", "** class name missing **"),
+                                 ("where MyModel a=1", "** class doesn't exist **"),
+                                 ("where Place price_by_night<x",
+                                  "** price_by_night must be int, not 'x' **"),
+                                 ("where Place junk", "** invalid condition: junk **"),
+                                 ("where Place limit=-1",
+                                  "** limit must be a non-negative integer **")):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(testCmd))
+                self.assertEqual(correct, output.getvalue().strip())
+
+    def test_where_unquoted_str_attr_keeps_text(self):
+        next(iter(storage.all("Place").values())).name = "007"
+        self.assertEqual(1, self.where("where Place name=007").count("[Place]"))
+        self.assertEqual(0, self.where("where Place name=7").count("[Place]"))
+
+
+class TestHBNBCommand_all_streaming(unittest.TestCase):
+    """Unittests for testing the streamed output of all."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        for classname in ("Place", "Place", "User"):
+            with patch("sys.stdout", new=StringIO()):
+                HBNBCommand().onecmd("create " + classname)
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def output(self, testCmd):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+        return output.getvalue()
+
+    def test_all_matches_list_output(self):
+        expected = [str(obj) for obj in storage.all().values()]
+        self.assertEqual(str(expected) + "\n", self.output("all"))
+        expected = [str(obj) for obj in storage.all("Place").values()]
+        self.assertEqual(str(expected) + "\n", self.output("Place.all()"))
+
+    def test_all_in_chunks(self):
+        expected = [str(obj) for obj in storage.all().values()]
+        with patch.object(HBNBCommand, "CHUNK", 2):
+            self.assertEqual(str(expected) + "\n", self.output("all"))
+
+    def test_all_empty_class(self):
+        self.assertEqual("[]\n", self.output("all State"))
+
+    def test_all_ndjson(self):
+        lines = self.output("Place.all(format=ndjson)").splitlines()
+        self.assertEqual(2, len(lines))
+        for line in lines:
+            value = json.loads(line)
+            self.assertEqual(storage.all()["Place." + value["id"]].to_dict(), value)
+        self.assertEqual(3, len(self.output("all format=ndjson").splitlines()))
+
+    def test_all_invalid_options(self):
+        self.assertEqual("** unknown format: xml **", self.output("all format=xml").strip())
+        self.assertEqual("** invalid option: junk **", self.output("all Place junk").strip())
+
+
+class TestHBNBCommand_all_pages(unittest.TestCase):
+    """Unittests for testing the paginated output of all."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.created = []
+        for _ in range(5):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create Place")
+            self.created.append(output.getvalue().strip())
+        self.ids = sorted(self.created)
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def output(self, testCmd):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+        return output.getvalue()
+
+    def page(self, testCmd):
+        return [json.loads(line)["id"] for line in
+                self.output(testCmd + " format=ndjson").splitlines()]
+
+    def test_limit_and_after(self):
+        self.assertEqual(self.ids[:2], self.page("all Place limit=2"))
+        self.assertEqual(self.ids[2:4],
+                         self.page("all Place limit=2 after={}".format(self.ids[1])))
+        self.assertEqual([], self.page("all Place after={}".format(self.ids[-1])))
+
+    def test_dot_notation(self):
+        expected = [str(storage.all()["Place." + id]) for id in self.ids[:2]]
+        self.assertEqual(str(expected) + "\n", self.output("Place.all(limit=2)"))
+
+    def test_created_at_order(self):
+        self.assertEqual(self.created[3:], self.page(
+            "all Place order=created_at after={}".format(self.created[2])))
+
+    def test_page_errors(self):
+        self.assertEqual("** class name missing **", self.output("all limit=2").strip())
+        self.assertEqual("** limit must be a non-negative integer **",
+                         self.output("all Place limit=-1").strip())
+        self.assertEqual("** unknown order: name **",
+                         self.output("all Place order=name").strip())
+        self.assertEqual("** no instance found **",
+                         self.output("all Place order=created_at after=x").strip())
+
+    def test_every_option_without_class_is_read(self):
+        self.assertEqual("** class name missing **",
+                         self.output("all format=ndjson limit=2").strip())
+        self.assertEqual("** invalid option: junk **",
+                         self.output("all format=ndjson junk").strip())
+
+
+class TestHBNBCommand_changes(unittest.TestCase):
+    """Unittests for testing the changes command."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.ids = []
+        for i, classname in enumerate(("Place", "User", "Place")):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create " + classname)
+            self.ids.append(output.getvalue().strip())
+            obj = storage.all()["{}.{}".format(classname, self.ids[-1])]
+            obj.updated_at = obj.updated_at.replace(year=2020, hour=i)
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def output(self, testCmd):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+        return output.getvalue()
+
+    def changes(self, testCmd):
+        return [json.loads(line)["id"] for line in
+                self.output(testCmd + " format=ndjson").splitlines()]
+
+    def test_changes_oldest_first(self):
+        self.assertEqual(self.ids, self.changes("changes"))
+        self.assertEqual(self.ids[:2], self.changes("changes limit=2"))
+        self.assertEqual([self.ids[0], self.ids[2]], self.changes("changes Place"))
+
+    def test_changes_since(self):
+        with patch("sys.stdout", new=StringIO()):
+            HBNBCommand().onecmd('update User {} first_name "Betty"'.format(self.ids[1]))
+        self.assertEqual([self.ids[1]], self.changes("changes since=-1h"))
+        self.assertEqual([], self.changes("changes Place since=-1h"))
+
+    def test_changes_dot_notation(self):
+        obj = storage.all()["Place." + self.ids[2]]
+        command = "Place.changes(since={}, until={})".format(
+            obj.updated_at.isoformat(), obj.updated_at.replace(year=2021).isoformat())
+        self.assertEqual(str([str(obj)]) + "\n", self.output(command))
+
+    def test_changes_created_at(self):
+        self.assertEqual(self.ids[1:], self.changes(
+            "changes field=created_at since={}".format(
+                storage.all()["User." + self.ids[1]].created_at.isoformat())))
+
+    def test_changes_errors(self):
+        self.assertEqual("** class doesn't exist **", self.output("changes Nope").strip())
+        self.assertEqual("** invalid time: soon **",
+                         self.output("changes since=soon").strip())
+        self.assertEqual("** unknown field: id **", self.output("changes field=id").strip())
+        self.assertEqual("** limit must be a non-negative integer **",
+                         self.output("changes limit=x").strip())
+
+
+class TestHBNBCommand_refresh(unittest.TestCase):
+    """Unittests for testing that commands see the saves of other processes."""
+
+    def test_precmd_refreshes(self):
+        with patch.object(storage, "refresh") as refresh:
+            self.assertEqual("all", HBNBCommand().precmd("all"))
+        refresh.assert_called_once_with()
+
+
+class TestHBNBCommand_read_only(unittest.TestCase):
+    """Unittests for testing write commands against a read-only storage."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, "file.map")
+        self.user = User()
+        FileStorage._FileStorage__objects = {}
+        snapshot.write(path, {"User." + self.user.id: self.user.to_dict()})
+        mapped = MappedStorage(path)
+        mapped.reload()
+        self.addCleanup(mapped.close)
+        for target in ("console.storage", "models.base_model.storage"):
+            patcher = patch(target, mapped)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.correct = "** {} is a read-only snapshot **".format(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_writes_are_refused(self):
+        uid = self.user.id
+        for testCmd in ("create User",
+                        "update User {} first_name Betty".format(uid),
+                        'User.update("{}", {{"first_name": "Betty"}})'.format(uid),
+                        'bulk_update User ["{}"] {{"first_name": "Betty"}}'.format(uid),
+                        "destroy User {}".format(uid)):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(testCmd))
+                self.assertEqual(self.correct, output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("show User {}".format(uid)))
+        self.assertEqual(str(self.user), output.getvalue().strip())
+
+
+
+class TestHBNBCommand_group_commit(unittest.TestCase):
+    """Unittests for testing time-based group commit in the console."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        storage.group_commit(interval=0.2)
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(target=HBNBCommand.flush_every,
+                                        args=(0.2, self.stopped))
+        self.flusher.start()
+
+    def tearDown(self):
+        self.stopped.set()
+        self.flusher.join()
+        storage.group_commit()
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_idle_console_writes_deferred_save(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create User"))
+        self.assertFalse(os.path.isfile("file.json"))
+        time.sleep(0.6)
+        with open("file.json", "r") as f:
+            self.assertIn("User." + output.getvalue().strip(), json.load(f))
+
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -5,13 +5,16 @@ Unit test classes:
     TestBaseModelInstantiation
     TestBaseModelSave
     TestBaseModelToDict
+    TestParseDatetime
+    TestCompactClass
 """
 import os
 import models
 import unittest
 from time import sleep
 from datetime import datetime
-from models.base_model import BaseModel
+from models.base_model import BaseModel, compact_class, parse_datetime
+from models.state import State
 
 
 class TestBaseModelInstantiation(unittest.TestCase):
@@ -188,6 +191,79 @@ class TestBaseModelToDict(unittest.TestCase):
             bm.to_dict(None)
 
 
+class TestParseDatetime(unittest.TestCase):
+    """Unit tests for testing the parse_datetime helper."""
+
+    def test_isoformat_round_trip(self):
+        dt = datetime.today()
+        self.assertEqual(dt, parse_datetime(dt.isoformat()))
+
+    def test_without_microseconds(self):
+        self.assertEqual(datetime(2017, 9, 28, 21, 5, 54),
+                         parse_datetime("2017-09-28T21:05:54"))
+
+    def test_short_fraction(self):
+        self.assertEqual(datetime(2017, 9, 28, 21, 5, 54, 100000),
+                         parse_datetime("2017-09-28T21:05:54.1"))
+
+    def test_invalid_string(self):
+        with self.assertRaises(ValueError):
+            parse_datetime("yesterday")
+
+    def test_None(self):
+        with self.assertRaises(TypeError):
+            parse_datetime(None)
+
+
+class TestCompactClass(unittest.TestCase):
+    """Unit tests for testing models built by compact_class."""
+
+    def setUp(self):
+        self.cls = compact_class(State, ["id", "created_at", "updated_at", "name"])
+
+    def test_keeps_name_and_base(self):
+        self.assertEqual("State", self.cls.__name__)
+        self.assertTrue(issubclass(self.cls, State))
+
+    def test_declared_attributes_not_in_dict(self):
+        st = self.cls()
+        st.name = "California"
+        self.assertEqual("California", st.name)
+        self.assertNotIn("name", st.__dict__)
+        self.assertNotIn("id", st.__dict__)
+
+    def test_unset_attribute_uses_class_default(self):
+        self.assertEqual("", self.cls().name)
+
+    def test_undeclared_attribute_goes_to_dict(self):
+        st = self.cls()
+        st.capital = "Sacramento"
+        self.assertEqual("Sacramento", st.__dict__["capital"])
+
+    def test_missing_attribute(self):
+        with self.assertRaises(AttributeError):
+            self.cls().capital
+
+    def test_to_dict_and_str(self):
+        st = self.cls()
+        st.name = "California"
+        st.capital = "Sacramento"
+        st_dict = st.to_dict()
+        self.assertEqual("State", st_dict["__class__"])
+        self.assertEqual(st.id, st_dict["id"])
+        self.assertEqual("California", st_dict["name"])
+        self.assertEqual("Sacramento", st_dict["capital"])
+        self.assertEqual(str, type(st_dict["created_at"]))
+        self.assertIn("'name': 'California'", str(st))
+
+    def test_kwargs_round_trip(self):
+        st = self.cls()
+        st.name = "California"
+        copy = self.cls(**st.to_dict())
+        self.assertEqual(st.to_dict(), copy.to_dict())
+        self.assertEqual(st.created_at, copy.created_at)
+
+
 if __name__ == "__main__":
     unittest.main()
 
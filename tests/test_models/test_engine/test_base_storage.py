@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/base_storage.py.
+
+Unittest classes:
+    TestBaseStorage_registry
+    TestBaseStorage_where
+"""
+import os
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+import models
+from models.place import Place
+from models.engine.file_storage import FileStorage
+from models.base_model import BaseModel, compact_class
+from models.engine.base_storage import BaseStorage
+
+
+class TestBaseStorage_registry(unittest.TestCase):
+    """Unittests for testing the class registry of the storage engines."""
+
+    def tearDown(self):
+        for name in ("Villa", "Tent"):
+            BaseStorage._BaseStorage__registry.pop(name, None)
+            BaseStorage._BaseStorage__attributes.pop(name, None)
+
+    def test_standard_classes(self):
+        self.assertEqual({"BaseModel", "User", "State", "City", "Amenity",
+                          "Place", "Review"}, set(models.storage.classes()))
+        self.assertIs(Place, models.storage.classes()["Place"])
+
+    def test_lookup_is_cached(self):
+        self.assertIs(models.storage.classes(), models.storage.classes())
+        self.assertIs(models.storage.attributes(), models.storage.attributes())
+
+    def test_attributes_follow_defaults(self):
+        attributes = models.storage.attributes()
+        self.assertEqual({"id": str, "created_at": datetime, "updated_at": datetime},
+                         attributes["BaseModel"])
+        self.assertEqual(int, attributes["Place"]["max_guest"])
+        self.assertEqual(float, attributes["Place"]["latitude"])
+        self.assertEqual(list, attributes["Place"]["amenity_ids"])
+
+    def test_subclass_is_registered(self):
+        class Villa(Place):
+            pool = False
+
+            def swim(self):
+                pass
+
+        self.assertIs(Villa, models.storage.classes()["Villa"])
+        attributes = models.storage.attributes()["Villa"]
+        self.assertEqual(bool, attributes["pool"])
+        self.assertEqual(int, attributes["max_guest"])
+        self.assertNotIn("swim", attributes)
+
+    def test_register_with_attributes(self):
+        class Tent(BaseModel):
+            pass
+
+        BaseStorage.register(Tent, {"size": int})
+        self.assertEqual({"size": int}, models.storage.attributes()["Tent"])
+
+    def test_compact_classes_are_not_registered(self):
+        compact_class(Place, {"name": None})
+        self.assertIs(Place, models.storage.classes()["Place"])
+
+
+class TestBaseStorage_where(unittest.TestCase):
+    """Unittests for testing where() queries of the storage engines."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for i in range(6):
+            pl = Place()
+            pl.price_by_night = 50 * i
+            pl.max_guest = i
+            pl.city_id = "c{}".format(i % 2)
+            self.places.append(pl)
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def where(self, *conditions, **kwargs):
+        return [pl.max_guest for pl in models.storage.where(Place, list(conditions), **kwargs)]
+
+    def test_ranges(self):
+        self.assertEqual([0, 1], sorted(self.where(("price_by_night", "<", 100))))
+        self.assertEqual([2, 3], sorted(self.where(("price_by_night", "<=", 150),
+                                                   ("max_guest", ">", 1))))
+
+    def test_equality_uses_lookup(self):
+        with patch.object(models.storage, "lookup", wraps=models.storage.lookup) as lookup:
+            self.assertEqual([3, 5], sorted(self.where(("city_id", "==", "c1"),
+                                                       ("max_guest", "!=", 1))))
+        lookup.assert_called_once_with("Place", "city_id", "c1")
+
+    def test_ranges_use_columns(self):
+        columns = models.storage.columns(Place)
+        with patch.object(columns, "where", wraps=columns.where) as where:
+            self.where(("max_guest", ">=", 4))
+        where.assert_called_once_with(max_guest=(4, None))
+
+    def test_mismatched_types_do_not_match(self):
+        self.places[0].max_guest = "many"
+        self.assertEqual([4, 5], sorted(self.where(("max_guest", ">", 3))))
+        self.assertEqual([], self.where(("pets", "==", "dog")))
+
+    def test_limit_and_offset_are_stable(self):
+        keys = sorted("Place." + pl.id for pl in self.places)
+        page = models.storage.where(Place, [], limit=2, offset=3)
+        self.assertEqual(keys[3:5], ["Place." + pl.id for pl in page])
+        self.assertEqual(1, len(models.storage.where(Place, [], offset=5)))
+
+    def test_unknown_operator(self):
+        with self.assertRaises(ValueError):
+            self.where(("max_guest", "~", 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
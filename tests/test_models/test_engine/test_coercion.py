@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/coercion.py.
+
+Unittest classes:
+    TestCoercer
+    TestLiteral
+"""
+import unittest
+from datetime import datetime
+import models
+from models.engine.coercion import Coercer, literal
+
+
+class TestCoercer(unittest.TestCase):
+    """Unittests for testing the Coercer class."""
+
+    def setUp(self):
+        self.coerce = models.storage.coercer("Place")
+
+    def test_coercer_is_cached(self):
+        self.assertIs(self.coerce, models.storage.coercer("Place"))
+
+    def test_str(self):
+        self.assertEqual("Loft", self.coerce("name", "Loft"))
+        self.assertEqual("12", self.coerce("name", 12))
+        with self.assertRaises(ValueError):
+            self.coerce("name", ["Loft"])
+
+    def test_int(self):
+        self.assertEqual(4, self.coerce("max_guest", 4))
+        self.assertEqual(4, self.coerce("max_guest", "4"))
+        self.assertEqual(4, self.coerce("max_guest", 4.0))
+        self.assertEqual(4, self.coerce("max_guest", "4.0"))
+        for value in (4.5, "4.5", "four", True, None):
+            with self.assertRaises(ValueError):
+                self.coerce("max_guest", value)
+
+    def test_float(self):
+        self.assertEqual(7.0, self.coerce("latitude", 7))
+        self.assertEqual(7.2, self.coerce("latitude", "7.2"))
+        for value in ("north", False, [7]):
+            with self.assertRaises(ValueError):
+                self.coerce("latitude", value)
+
+    def test_list(self):
+        self.assertEqual(["a"], self.coerce("amenity_ids", ["a"]))
+        self.assertEqual(["a"], self.coerce("amenity_ids", '["a"]'))
+        for value in ("a", '{"a": 1}', 3):
+            with self.assertRaises(ValueError):
+                self.coerce("amenity_ids", value)
+
+    def test_datetime(self):
+        when = datetime(2024, 1, 2, 3, 4, 5, 6)
+        self.assertEqual(when, self.coerce("created_at", when.isoformat()))
+        self.assertIs(when, self.coerce("updated_at", when))
+        with self.assertRaises(ValueError):
+            self.coerce("created_at", "yesterday")
+
+    def test_undeclared_attribute_is_kept(self):
+        self.assertEqual([1], self.coerce("color", [1]))
+
+    def test_error_message(self):
+        with self.assertRaisesRegex(ValueError, "^max_guest must be int, not 'x'$"):
+            self.coerce("max_guest", "x")
+
+    def test_convert(self):
+        self.assertEqual({"max_guest": 3, "color": "red"},
+                         self.coerce.convert({"max_guest": "3", "color": "red"}))
+        with self.assertRaises(ValueError):
+            self.coerce.convert({"max_guest": "3", "latitude": "north"})
+
+    def test_custom_attributes(self):
+        coerce = Coercer({"size": int})
+        self.assertEqual(3, coerce("size", "3"))
+
+
+class TestLiteral(unittest.TestCase):
+    """Unittests for testing the literal function."""
+
+    def test_literal(self):
+        self.assertEqual(3, literal("3"))
+        self.assertEqual(3.5, literal("3.5"))
+        self.assertEqual("three", literal("three"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/columns.py.
+
+Unittest classes:
+    TestColumns
+"""
+import unittest
+import models
+from models.place import Place
+from models.engine.columns import Columns
+from models.engine.file_storage import FileStorage
+
+
+class TestColumns(unittest.TestCase):
+    """Unittests for testing the Columns mirror of Place attributes."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = []
+        for price, guests in ((50, 2), (90, 4), (150, 6), (300, 8)):
+            pl = Place()
+            pl.price_by_night = price
+            pl.max_guest = guests
+            self.places.append(pl)
+        self.columns = models.storage.columns(Place)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_columns_is_cached(self):
+        self.assertIs(self.columns, models.storage.columns("Place"))
+        self.assertEqual(Columns, type(self.columns))
+
+    def test_fields_are_numeric_attributes(self):
+        self.assertIn("price_by_night", self.columns.fields())
+        self.assertIn("latitude", self.columns.fields())
+        self.assertNotIn("name", self.columns.fields())
+
+    def test_where_ranges(self):
+        found = self.columns.where(price_by_night=(None, 100), max_guest=(4, None))
+        self.assertEqual([self.places[1]], found)
+
+    def test_where_without_ranges(self):
+        self.assertEqual(4, len(self.columns.where()))
+
+    def test_count(self):
+        self.assertEqual(2, self.columns.count(price_by_night=(90, 150)))
+
+    def test_aggregates(self):
+        self.assertEqual(590, self.columns.sum("price_by_night"))
+        self.assertEqual(5, self.columns.mean("max_guest"))
+        self.assertEqual(90, self.columns.min("price_by_night", max_guest=(3, None)))
+        self.assertEqual(300, self.columns.max("price_by_night"))
+
+    def test_aggregate_of_nothing(self):
+        self.assertIsNone(self.columns.mean("price_by_night", max_guest=(100, None)))
+
+    def test_refreshes_after_changes(self):
+        self.assertEqual(1, self.columns.count(price_by_night=(300, None)))
+        self.places[0].price_by_night = 400
+        pl = Place()
+        pl.price_by_night = 500
+        self.assertEqual(3, self.columns.count(price_by_night=(300, None)))
+        models.storage.delete(pl)
+        self.assertEqual(2, self.columns.count(price_by_night=(300, None)))
+
+    def test_non_numeric_values_never_match(self):
+        self.places[0].price_by_night = "free"
+        self.assertEqual(3, self.columns.count(price_by_night=(None, None)))
+
+    def test_unknown_field(self):
+        with self.assertRaises(KeyError):
+            self.columns.where(name=(None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,11 +4,29 @@
 Unittest classes:
     TestFileStorage_instantiation
     TestFileStorage_methods
+    TestFileStorage_journal
+    TestFileStorage_lazy
+    TestFileStorage_batch
+    TestFileStorage_background
+    TestFileStorage_binary
+    TestFileStorage_shards
+    TestFileStorage_workers
+    TestFileStorage_indexes
+    TestFileStorage_pages
+    TestFileStorage_times
+    TestFileStorage_changes
+    TestFileStorage_shared
 """
 import os
+import sys
 import json
+import pickle
+import subprocess
+import multiprocessing
 import models
+import threading
 import unittest
+from unittest.mock import patch
 from datetime import datetime
 from models.user import User
 from models.state import State
@@ -17,7 +35,8 @@ from models.city import City
 from models.amenity import Amenity
 from models.review import Review
 from models.base_model import BaseModel
-from models.engine.file_storage import FileStorage
+from models.engine import snapshot
+from models.engine.file_storage import FileStorage, fcntl
 
 
 class TestFileStorage_instantiation(unittest.TestCase):
@@ -30,14 +49,18 @@ class TestFileStorage_instantiation(unittest.TestCase):
         with self.assertRaises(TypeError):
             FileStorage(None)
 
+    def test_FileStorage_invalid_durability(self):
+        with self.assertRaises(ValueError):
+            FileStorage(durability="always")
+
     def test_file_storage_file_path_is_private_str(self):
-    self.assertEqual(str, type(FileStorage._FileStorage__file_path))
+        self.assertEqual(str, type(FileStorage._FileStorage__file_path))
 
     def testFileStorage_objects_is_private_dict(self):
         self.assertEqual(dict, type(FileStorage._FileStorage__objects))
 
     def test_storage_initialized_correctly(self):
-    self.assertIs(type(models.Storage), FileStorage)
+        self.assertIs(type(models.storage), FileStorage)
 
 
 class TestFileStorage_methods(unittest.TestCase):
@@ -65,9 +88,30 @@ class TestFileStorage_methods(unittest.TestCase):
     def test_all(self):
         self.assertEqual(dict, type(models.storage.all()))
 
-    def test_all_with_arg(self):
+    def test_all_with_cls(self):
+        bm = BaseModel()
+        us = User()
+        self.assertEqual({"User." + us.id: us}, models.storage.all(User))
+        self.assertEqual({"User." + us.id: us}, models.storage.all("User"))
+        self.assertNotIn("BaseModel." + bm.id, models.storage.all(User))
+
+    def test_all_with_two_args(self):
         with self.assertRaises(TypeError):
-            models.storage.all(None)
+            models.storage.all(User, None)
+
+    def test_count(self):
+        BaseModel()
+        User()
+        User()
+        self.assertEqual(3, models.storage.count())
+        self.assertEqual(2, models.storage.count(User))
+        self.assertEqual(1, models.storage.count("BaseModel"))
+        self.assertEqual(0, models.storage.count(Place))
+
+    def test_count_after_delete(self):
+        us = User()
+        models.storage.delete(us)
+        self.assertEqual(0, models.storage.count(User))
 
     def test_new(self):
         bm = BaseModel()
@@ -134,6 +178,31 @@ class TestFileStorage_methods(unittest.TestCase):
             self.assertIn("Amenity." + am.id, save_text)
             self.assertIn("Review." + rv.id, save_text)
 
+    def test_save_leaves_no_temporary_file(self):
+        BaseModel()
+        models.storage.save()
+        self.assertEqual([], [n for n in os.listdir(".") if n.endswith(".tmp")])
+
+    def test_failed_save_keeps_previous_file(self):
+        bm = BaseModel()
+        models.storage.save()
+        us = User()
+        with patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                models.storage.save()
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertIn("BaseModel." + bm.id, saved)
+        self.assertNotIn("User." + us.id, saved)
+        self.assertEqual([], [n for n in os.listdir(".") if n.endswith(".tmp")])
+
+    def test_save_durability_levels(self):
+        BaseModel()
+        for durability, syncs in (("none", 0), ("file", 1), ("dir", 2)):
+            with patch("os.fsync") as fsync:
+                FileStorage(durability=durability).save()
+            self.assertEqual(syncs, fsync.call_count)
+
     def test_save_with_arg(self):
         with self.assertRaises(TypeError):
             models.storage.save(None)
@@ -164,10 +233,1068 @@ class TestFileStorage_methods(unittest.TestCase):
         self.assertIn("Amenity." + am.id, objs)
         self.assertIn("Review." + rv.id, objs)
 
+    def test_save_reencodes_dirty_objects_only(self):
+        bm = BaseModel()
+        us = User()
+        models.storage.save()
+        us.first_name = "Betty"
+        with patch.object(BaseModel, "to_dict", autospec=True,
+                          side_effect=BaseModel.to_dict) as to_dict:
+            models.storage.save()
+        to_dict.assert_called_once_with(us)
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual("Betty", saved["User." + us.id]["first_name"])
+        self.assertIn("BaseModel." + bm.id, saved)
+
+    def test_save_drops_deleted_objects(self):
+        bm = BaseModel()
+        models.storage.save()
+        models.storage.delete(bm)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertNotIn("BaseModel." + bm.id, json.load(f))
+
+    def test_reload_compact(self):
+        pl = Place()
+        pl.name = "Cabin"
+        models.storage.save()
+        storage = FileStorage(compact=True)
+        storage.reload()
+        compact_place = storage.classes()["Place"]
+        self.assertIsNot(Place, compact_place)
+        self.assertIs(compact_place, storage.classes()["Place"])
+        loaded = FileStorage._FileStorage__objects["Place." + pl.id]
+        self.assertIs(compact_place, type(loaded))
+        self.assertEqual("Cabin", loaded.name)
+        self.assertNotIn("name", loaded.__dict__)
+        self.assertEqual(pl.to_dict(), loaded.to_dict())
+
     def test_reload_with_arg(self):
         with self.assertRaises(TypeError):
             models.storage.reload(None)
 
 
+class TestFileStorage_journal(unittest.TestCase):
+    """Unittests for testing journal mode of the FileStorage class."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        self.storage = FileStorage(journal=True, compact_every=3)
+
+    def tearDown(self):
+        for path in ("file.json", "file.json.journal"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_first_save_writes_snapshot(self):
+        self.storage.new(BaseModel())
+        self.storage.save()
+        self.assertTrue(os.path.isfile("file.json"))
+        self.assertFalse(os.path.isfile("file.json.journal"))
+
+    def test_save_appends_changed_objects_only(self):
+        bm = BaseModel()
+        self.storage.new(bm)
+        self.storage.save()
+        us = User()
+        self.storage.new(us)
+        self.storage.save()
+        with open("file.json.journal", "r") as f:
+            lines = f.readlines()
+        self.assertEqual(1, len(lines))
+        self.assertEqual("User." + us.id, json.loads(lines[0])["key"])
+        with open("file.json", "r") as f:
+            self.assertNotIn(us.id, f.read())
+
+    def test_reload_replays_journal(self):
+        bm = BaseModel()
+        us = User()
+        self.storage.new(bm)
+        self.storage.new(us)
+        self.storage.save()
+        us.first_name = "Betty"
+        self.storage.new(us)
+        self.storage.delete(bm)
+        self.storage.save()
+        self.storage.reload()
+        objs = FileStorage._FileStorage__objects
+        self.assertNotIn("BaseModel." + bm.id, objs)
+        self.assertEqual("Betty", objs["User." + us.id].first_name)
+
+    def test_reload_cuts_torn_journal_record(self):
+        storage = FileStorage(journal=True, compact_every=10)
+        storage.new(BaseModel())
+        storage.save()
+        storage.new(BaseModel())
+        storage.save()
+        with open("file.json.journal", "a") as f:
+            f.write('{"key": "BaseModel.torn", "val')
+        storage.reload()
+        for _ in range(2):
+            storage.new(BaseModel())
+            storage.save()
+        storage.reload()
+        self.assertEqual(4, len(FileStorage._FileStorage__objects))
+        self.assertNotIn("BaseModel.torn", FileStorage._FileStorage__objects)
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        self.storage.new(BaseModel())
+        self.storage.save()
+        for _ in range(4):
+            self.storage.new(BaseModel())
+            self.storage.save()
+        self.assertFalse(os.path.isfile("file.json.journal"))
+        with open("file.json", "r") as f:
+            self.assertEqual(len(models.storage.all()), len(json.load(f)))
+
+
+class TestFileStorage_lazy(unittest.TestCase):
+    """Unittests for testing lazy reload of the FileStorage class."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        self.bm = BaseModel()
+        self.us = User()
+        self.us.first_name = "Betty"
+        models.storage.save()
+        self.storage = FileStorage(lazy=True)
+        self.storage.reload()
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_reload_builds_no_objects(self):
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+
+    def test_get_builds_one_object(self):
+        us = self.storage.get(User, self.us.id)
+        self.assertEqual("Betty", us.first_name)
+        self.assertEqual(["User." + self.us.id],
+                         list(FileStorage._FileStorage__objects))
+        self.assertIs(us, self.storage.get("User", self.us.id))
+
+    def test_get_missing(self):
+        self.assertIsNone(self.storage.get(User, "missing"))
+
+    def test_count_builds_no_objects(self):
+        self.assertEqual(1, self.storage.count(User))
+        self.assertEqual(2, self.storage.count())
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+
+    def test_all_with_cls_builds_that_class(self):
+        self.assertEqual(["User." + self.us.id], list(self.storage.all(User)))
+        self.assertNotIn("BaseModel." + self.bm.id,
+                         FileStorage._FileStorage__objects)
+
+    def test_all_builds_every_object(self):
+        objs = self.storage.all()
+        self.assertIn("BaseModel." + self.bm.id, objs)
+        self.assertIn("User." + self.us.id, objs)
+
+    def test_save_keeps_unread_objects(self):
+        self.storage.new(State())
+        self.storage.save()
+        self.assertNotIn("User." + self.us.id, FileStorage._FileStorage__objects)
+        self.assertEqual("Betty", self.storage.get(User, self.us.id).first_name)
+        with open("file.json", "r") as f:
+            self.assertIn("BaseModel." + self.bm.id, json.load(f))
+
+
+class TestFileStorage_batch(unittest.TestCase):
+    """Unittests for testing deferred saves of the FileStorage class."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        self.storage = FileStorage()
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def saved_keys(self):
+        with open("file.json", "r") as f:
+            return set(json.load(f))
+
+    def test_batch_writes_once_on_exit(self):
+        with patch("os.replace", wraps=os.replace) as replace:
+            with self.storage.batch():
+                for _ in range(5):
+                    self.storage.new(BaseModel())
+                    self.storage.save()
+                self.assertFalse(os.path.isfile("file.json"))
+        self.assertEqual(1, replace.call_count)
+        self.assertEqual(5, len(self.saved_keys()))
+
+    def test_nested_batches_write_at_outermost_exit(self):
+        with self.storage.batch():
+            with self.storage.batch():
+                self.storage.new(BaseModel())
+                self.storage.save()
+            self.assertFalse(os.path.isfile("file.json"))
+        self.assertTrue(os.path.isfile("file.json"))
+
+    def test_batch_without_save_writes_nothing(self):
+        with self.storage.batch():
+            pass
+        self.assertFalse(os.path.isfile("file.json"))
+
+    def test_failed_batch_defers_to_next_save(self):
+        bm = BaseModel()
+        with self.assertRaises(RuntimeError):
+            with self.storage.batch():
+                self.storage.new(bm)
+                self.storage.save()
+                raise RuntimeError
+        self.assertFalse(os.path.isfile("file.json"))
+        self.storage.flush()
+        self.assertIn("BaseModel." + bm.id, self.saved_keys())
+
+    def test_group_commit_by_count(self):
+        self.storage.group_commit(count=3)
+        for _ in range(2):
+            self.storage.new(BaseModel())
+            self.storage.save()
+        self.assertFalse(os.path.isfile("file.json"))
+        self.storage.new(BaseModel())
+        self.storage.save()
+        self.assertEqual(3, len(self.saved_keys()))
+
+    def test_group_commit_by_interval(self):
+        self.storage.group_commit(interval=0)
+        self.storage.new(BaseModel())
+        self.storage.save()
+        self.assertTrue(os.path.isfile("file.json"))
+
+    def test_disabling_group_commit_flushes(self):
+        self.storage.group_commit(count=10)
+        self.storage.new(BaseModel())
+        self.storage.save()
+        self.storage.group_commit()
+        self.assertEqual(1, len(self.saved_keys()))
+
+
+class TestFileStorage_background(unittest.TestCase):
+    """Unittests for testing background saves of the FileStorage class."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        with patch("atexit.register"):
+            self.storage = FileStorage(background=True)
+
+    def tearDown(self):
+        self.storage.close()
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_flush_waits_for_the_write(self):
+        bm = BaseModel()
+        self.storage.new(bm)
+        self.storage.save()
+        self.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertIn("BaseModel." + bm.id, json.load(f))
+
+    def test_pending_snapshots_are_coalesced(self):
+        release = threading.Event()
+        real_fsync = os.fsync
+
+        def slow_fsync(fd):
+            release.wait(5)
+            real_fsync(fd)
+
+        with patch("os.fsync", side_effect=slow_fsync), \
+                patch("os.replace", wraps=os.replace) as replace:
+            for _ in range(5):
+                self.storage.new(BaseModel())
+                self.storage.save()
+            release.set()
+            self.storage.flush()
+        self.assertLessEqual(replace.call_count, 2)
+        with open("file.json", "r") as f:
+            self.assertEqual(5, len(json.load(f)))
+
+    def test_sharded_snapshots_keep_other_shards(self):
+        with patch("atexit.register"):
+            storage = FileStorage(shards="class", background=True)
+        self.addCleanup(lambda: [os.remove(name) for name in os.listdir(".")
+                                 if name.startswith("file.") and name != "file.json"])
+        release = threading.Event()
+        real_fsync = os.fsync
+
+        def slow_fsync(fd):
+            release.wait(5)
+            real_fsync(fd)
+
+        us, pl = User(), Place()
+        with patch("os.fsync", side_effect=slow_fsync):
+            for obj in (us, pl, us):
+                storage.touch(obj)
+                storage.save()
+            release.set()
+            storage.flush()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertIsNotNone(storage.get(Place, pl.id))
+        self.assertIsNotNone(storage.get(User, us.id))
+
+    def test_flush_raises_writer_error(self):
+        self.storage.new(BaseModel())
+        with patch("os.replace", side_effect=OSError("disk full")):
+            self.storage.save()
+            with self.assertRaises(OSError):
+                self.storage.flush()
+        self.storage.flush()
+
+    def test_close_makes_saves_synchronous(self):
+        self.storage.close()
+        self.storage.new(BaseModel())
+        with patch("threading.Thread") as thread:
+            self.storage.save()
+        thread.assert_not_called()
+        self.assertTrue(os.path.isfile("file.json"))
+
+
+class TestFileStorage_binary(unittest.TestCase):
+    """Unittests for testing binary snapshots of the FileStorage class."""
+
+    def setUp(self):
+        self.storage = FileStorage(path="file.bin")
+        self.pl = Place()
+        self.pl.name = "Loft"
+        self.pl.amenity_ids = ["wifi"]
+        self.us = User()
+        self.storage.new(self.pl)
+        self.storage.new(self.us)
+
+    def tearDown(self):
+        for path in ("file.bin", "file.bin.json", "file.bin.journal"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_format_follows_extension(self):
+        self.storage.save()
+        with open("file.bin", "rb") as f:
+            self.assertEqual(snapshot.MAGIC, f.read(len(snapshot.MAGIC)))
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            FileStorage(format="xml")
+
+    def test_reload_round_trip(self):
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        loaded = self.storage.get(Place, self.pl.id)
+        self.assertEqual(self.pl.to_dict(), loaded.to_dict())
+        self.assertEqual(datetime, type(loaded.created_at))
+        self.assertEqual(self.pl.updated_at, loaded.updated_at)
+        self.assertIsNotNone(self.storage.get(User, self.us.id))
+
+    def test_journal_over_binary_snapshot(self):
+        storage = FileStorage(path="file.bin", journal=True)
+        storage.new(self.pl)
+        storage.save()
+        self.us.first_name = "Betty"
+        storage.new(self.us)
+        storage.save()
+        self.assertTrue(os.path.isfile("file.bin.journal"))
+        storage.reload()
+        self.assertEqual("Betty", storage.get(User, self.us.id).first_name)
+
+    def test_compaction_after_journaled_updates(self):
+        storage = FileStorage(path="file.bin", journal=True, compact_every=2)
+        for name in ("A", "B", "C"):
+            self.us.first_name = name
+            storage.touch(self.us, "first_name")
+            storage.save()
+        storage.new(BaseModel())
+        storage.save()
+        self.assertFalse(os.path.isfile("file.bin.journal"))
+        storage.reload()
+        self.assertEqual("C", storage.get(User, self.us.id).first_name)
+
+    def test_convert_both_ways(self):
+        self.storage.save()
+        snapshot.convert("file.bin", "file.bin.json")
+        with open("file.bin.json", "r") as f:
+            self.assertEqual(self.pl.to_dict(), json.load(f)["Place." + self.pl.id])
+        os.remove("file.bin")
+        snapshot.convert("file.bin.json", "file.bin")
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.pl.to_dict(), self.storage.get(Place, self.pl.id).to_dict())
+
+    def test_snapshot_refuses_globals(self):
+        with open("file.bin", "wb") as f:
+            f.write(snapshot.MAGIC)
+            f.write(pickle.dumps(([], [datetime.now()])))
+        with self.assertRaises(pickle.UnpicklingError):
+            self.storage.reload()
+
+
+class TestFileStorage_shards(unittest.TestCase):
+    """Unittests for testing sharded files of the FileStorage class."""
+
+    def setUp(self):
+        self.storage = FileStorage(shards="class")
+        self.pl = Place()
+        self.us = User()
+        self.storage.new(self.pl)
+        self.storage.new(self.us)
+
+    def tearDown(self):
+        for name in os.listdir("."):
+            if name.startswith("file.") and name != "file.json":
+                os.remove(name)
+        FileStorage._FileStorage__objects = {}
+
+    def test_invalid_shards(self):
+        for shards in (0, -2, "id", 2.5):
+            with self.assertRaises(ValueError):
+                FileStorage(shards=shards)
+        with self.assertRaises(ValueError):
+            FileStorage(shards="class", journal=True)
+        with self.assertRaises(ValueError):
+            FileStorage(shards=4, lazy=True)
+
+    def test_one_file_per_class(self):
+        self.storage.save()
+        with open("file.Place.json", "r") as f:
+            self.assertEqual(["Place." + self.pl.id], list(json.load(f)))
+        with open("file.User.json", "r") as f:
+            self.assertEqual(["User." + self.us.id], list(json.load(f)))
+        self.assertFalse(os.path.isfile("file.json"))
+
+    def test_reload_round_trip(self):
+        self.pl.name = "Loft"
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.reload()
+        self.assertEqual(self.pl.to_dict(), self.storage.get(Place, self.pl.id).to_dict())
+        self.assertEqual(2, self.storage.count())
+
+    def test_save_rewrites_changed_shards_only(self):
+        self.storage.save()
+        self.storage.reload()
+        os.remove("file.Place.json")
+        us = self.storage.get(User, self.us.id)
+        us.first_name = "Betty"
+        self.storage.touch(us)
+        self.storage.save()
+        self.assertFalse(os.path.isfile("file.Place.json"))
+        with open("file.User.json", "r") as f:
+            self.assertEqual("Betty", json.load(f)["User." + self.us.id]["first_name"])
+
+    def test_delete_rewrites_shard(self):
+        self.storage.save()
+        self.storage.delete(self.pl)
+        self.storage.save()
+        with open("file.Place.json", "r") as f:
+            self.assertEqual({}, json.load(f))
+
+    def test_replaced_objects_rewrite_every_shard(self):
+        self.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.storage.save()
+        self.storage.reload()
+        self.assertEqual(0, self.storage.count())
+
+    def test_hash_buckets(self):
+        storage = FileStorage(shards=4)
+        users = [User() for _ in range(20)]
+        storage.save()
+        keys = set()
+        for i in range(4):
+            with open("file.{}.json".format(i), "r") as f:
+                keys.update(json.load(f))
+        self.assertEqual(set(storage.all()), keys)
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(users[7].to_dict(), storage.get(User, users[7].id).to_dict())
+
+    def test_binary_shards(self):
+        storage = FileStorage(path="file.bin", shards="class")
+        storage.save()
+        with open("file.Place.bin", "rb") as f:
+            self.assertEqual(snapshot.MAGIC, f.read(len(snapshot.MAGIC)))
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(self.us.to_dict(), storage.get(User, self.us.id).to_dict())
+
+
+class TestFileStorage_workers(unittest.TestCase):
+    """Unittests for testing reload() from worker processes."""
+
+    def setUp(self):
+        self.objects = [cls() for cls in (User, State, City, Place, Review) * 10]
+        self.objects[3].name = "Loft"
+        self.objects[3].amenity_ids = ["wifi"]
+
+    def tearDown(self):
+        for name in os.listdir("."):
+            if name.startswith("file."):
+                os.remove(name)
+        FileStorage._FileStorage__objects = {}
+
+    def assertReloads(self, storage):
+        expected = {k: v.to_dict() for k, v in storage.all().items()}
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual(expected, {k: v.to_dict() for k, v in storage.all().items()})
+        for obj in storage.all().values():
+            self.assertEqual(datetime, type(obj.created_at))
+
+    def test_invalid_workers(self):
+        for workers in (0, -1, 1.5, None):
+            with self.assertRaises(ValueError):
+                FileStorage(workers=workers)
+
+    def test_byte_ranges(self):
+        storage = FileStorage(workers=3)
+        storage.save()
+        self.assertReloads(storage)
+
+    def test_more_workers_than_objects(self):
+        FileStorage._FileStorage__objects = {"User." + self.objects[0].id: self.objects[0]}
+        storage = FileStorage(workers=8)
+        storage.save()
+        self.assertReloads(storage)
+
+    def test_other_json_layout(self):
+        with open("file.json", "w") as f:
+            json.dump({"User." + self.objects[0].id: self.objects[0].to_dict()}, f)
+        storage = FileStorage(workers=2)
+        storage.reload()
+        self.assertEqual(1, storage.count())
+
+    def test_empty_file(self):
+        storage = FileStorage(workers=2)
+        FileStorage._FileStorage__objects = {}
+        storage.save()
+        self.assertReloads(storage)
+        self.assertEqual(0, storage.count())
+
+    def test_shards(self):
+        storage = FileStorage(path="file.bin", shards=3, workers=2)
+        storage.save()
+        self.assertReloads(storage)
+
+    def test_journal_replayed(self):
+        storage = FileStorage(journal=True, workers=2)
+        storage.save()
+        self.objects[0].first_name = "Betty"
+        storage.touch(self.objects[0])
+        storage.save()
+        FileStorage._FileStorage__objects = {}
+        storage.reload()
+        self.assertEqual("Betty", storage.get(User, self.objects[0].id).first_name)
+
+    def test_spawn_start_method(self):
+        storage = FileStorage(workers=2)
+        storage.save()
+        script = ("import multiprocessing; multiprocessing.set_start_method('spawn'); "
+                  "import models; print(models.storage.count())")
+        result = subprocess.run([sys.executable, "-c", script], timeout=30,
+                                env=dict(os.environ, HBNB_RELOAD_WORKERS="2"),
+                                capture_output=True, text=True)
+        self.assertEqual(str(storage.count()), result.stdout.strip())
+
+
+class TestFileStorage_indexes(unittest.TestCase):
+    """Unittests for testing the field indexes of the FileStorage class."""
+
+    def setUp(self):
+        self.storage = models.storage
+        self.st = State()
+        self.cities = [City() for _ in range(3)]
+        for cy in self.cities[:2]:
+            cy.state_id = self.st.id
+        self.other = City()
+        self.other.state_id = "other"
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def keys(self, *objects):
+        return {"{}.{}".format(type(obj).__name__, obj.id) for obj in objects}
+
+    def test_lookup(self):
+        found = self.storage.lookup(City, "state_id", self.st.id)
+        self.assertEqual(self.keys(*self.cities[:2]), set(found))
+        self.assertIs(self.cities[0], found["City." + self.cities[0].id])
+        self.assertEqual({}, self.storage.lookup("Place", "state_id", self.st.id))
+        self.assertEqual({}, self.storage.lookup(City, "state_id", "missing"))
+
+    def test_new_and_update(self):
+        self.storage.lookup(City, "state_id", self.st.id)
+        cy = City()
+        cy.state_id = self.st.id
+        self.cities[0].state_id = "other"
+        self.assertEqual(self.keys(cy, self.cities[1]),
+                         set(self.storage.lookup(City, "state_id", self.st.id)))
+        self.assertEqual(self.keys(self.other, self.cities[0]),
+                         set(self.storage.lookup(City, "state_id", "other")))
+
+    def test_delete(self):
+        self.storage.lookup(City, "state_id", self.st.id)
+        self.storage.delete(self.cities[0])
+        self.assertEqual(self.keys(self.cities[1]),
+                         set(self.storage.lookup(City, "state_id", self.st.id)))
+
+    def test_reload(self):
+        self.storage.lookup(City, "state_id", self.st.id)
+        self.storage.save()
+        self.storage.reload()
+        found = self.storage.lookup(City, "state_id", self.st.id)
+        self.assertEqual(self.keys(*self.cities[:2]), set(found))
+        self.assertIsNot(self.cities[0], found["City." + self.cities[0].id])
+
+    def test_replaced_objects(self):
+        self.storage.lookup(City, "state_id", self.st.id)
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual({}, self.storage.lookup(City, "state_id", self.st.id))
+
+    def test_lazy_reload(self):
+        self.storage.save()
+        storage = FileStorage(lazy=True)
+        storage.reload()
+        self.assertEqual(self.keys(*self.cities[:2]),
+                         set(storage.lookup(City, "state_id", self.st.id)))
+
+    def test_unindexed_field_scans(self):
+        self.cities[2].name = "Paris"
+        storage = FileStorage(indexes=())
+        self.assertEqual(self.keys(self.cities[2]),
+                         set(self.storage.lookup(City, "name", "Paris")))
+        self.assertEqual(self.keys(*self.cities[:2]),
+                         set(storage.lookup(City, "state_id", self.st.id)))
+
+
+class TestFileStorage_pages(unittest.TestCase):
+    """Unittests for testing the sorted pages of the FileStorage class."""
+
+    def setUp(self):
+        self.storage = models.storage
+        self.places = [Place() for _ in range(5)]
+        for i, pl in enumerate(self.places):
+            pl.created_at = datetime(2020, 1, 5 - i)
+            self.storage.touch(pl)
+        self.ids = sorted(pl.id for pl in self.places)
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def ids_of(self, objects):
+        return [obj.id for obj in objects]
+
+    def test_id_order(self):
+        self.assertEqual(self.ids[:2], self.ids_of(self.storage.page(Place, 2)))
+        self.assertEqual(self.ids[2:4],
+                         self.ids_of(self.storage.page("Place", 2, after=self.ids[1])))
+        self.assertEqual([], self.storage.page(Place, after=self.ids[-1]))
+        self.assertEqual([], self.storage.page("State"))
+
+    def test_created_at_order(self):
+        newest = [pl.id for pl in reversed(self.places)]
+        self.assertEqual(newest, self.ids_of(self.storage.page(Place, order="created_at")))
+        self.assertEqual(newest[3:], self.ids_of(
+            self.storage.page(Place, 3, after=newest[2], order="created_at")))
+
+    def test_new_update_and_delete(self):
+        self.storage.page(Place, order="created_at")
+        self.storage.page(Place)
+        pl = Place()
+        self.places[4].created_at = datetime(2021, 1, 1)
+        self.storage.delete(self.places[0])
+        self.assertEqual([self.places[3].id, self.places[2].id, self.places[1].id],
+                         self.ids_of(self.storage.page(Place, 3, order="created_at")))
+        self.assertEqual([self.places[4].id, pl.id],
+                         self.ids_of(self.storage.page(Place, order="created_at")[-2:]))
+        ids = sorted(set(self.ids) - {self.places[0].id} | {pl.id})
+        self.assertEqual(ids, self.ids_of(self.storage.page(Place)))
+
+    def test_deleted_cursor(self):
+        gone = self.ids[1]
+        self.storage.delete(self.storage.get(Place, gone))
+        self.assertEqual(self.ids[2:], self.ids_of(self.storage.page(Place, after=gone)))
+        with self.assertRaises(KeyError):
+            self.storage.page(Place, after=gone, order="created_at")
+
+    def test_unknown_order(self):
+        with self.assertRaises(ValueError):
+            self.storage.page(Place, order="name")
+
+    def test_replaced_objects(self):
+        self.storage.page(Place)
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual([], self.storage.page(Place))
+
+
+class TestFileStorage_times(unittest.TestCase):
+    """Unittests for testing the time-range queries of the FileStorage class."""
+
+    def setUp(self):
+        self.storage = models.storage
+        self.objects = [Place(), User(), Place(), State()]
+        for i, obj in enumerate(self.objects):
+            obj.updated_at = datetime(2020, 1, 1, i)
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def ids_of(self, objects):
+        return [obj.id for obj in objects]
+
+    def test_between(self):
+        ids = self.ids_of(self.objects)
+        self.assertEqual(ids, self.ids_of(self.storage.between()))
+        self.assertEqual(ids[1:3], self.ids_of(self.storage.between(
+            start=datetime(2020, 1, 1, 1), stop=datetime(2020, 1, 1, 3))))
+        self.assertEqual([ids[2]], self.ids_of(self.storage.between(
+            Place, start=datetime(2020, 1, 1, 1))))
+        self.assertEqual([], self.storage.between("Amenity"))
+
+    def test_updates_move_objects(self):
+        self.storage.between()
+        self.objects[0].save()
+        st = State()
+        st.updated_at = datetime(2019, 1, 1)
+        self.storage.delete(self.objects[1])
+        self.assertEqual([st.id, self.objects[2].id, self.objects[3].id,
+                          self.objects[0].id], self.ids_of(self.storage.between()))
+
+    def test_created_at(self):
+        self.assertEqual(self.ids_of(self.objects), self.ids_of(
+            self.storage.between(field="created_at")))
+
+    def test_unknown_field(self):
+        with self.assertRaises(ValueError):
+            self.storage.between(field="id")
+
+    def test_where_uses_between(self):
+        with patch.object(self.storage, "between", wraps=self.storage.between) as between:
+            found = self.storage.where(Place, [("updated_at", ">", datetime(2020, 1, 1)),
+                                               ("updated_at", "<=", datetime(2020, 1, 1, 2))])
+        self.assertEqual([self.objects[2].id], self.ids_of(found))
+        between.assert_called_once_with("Place", "updated_at", datetime(2020, 1, 1),
+                                        datetime(2020, 1, 1, 2, 0, 0, 1))
+
+
+class TestFileStorage_changes(unittest.TestCase):
+    """Unittests for testing the change events of the FileStorage class."""
+
+    def setUp(self):
+        self.storage = FileStorage(changelog=True)
+        patcher = patch("models.base_model.storage", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.events = []
+        self.storage.subscribe(self.events.append)
+
+    def tearDown(self):
+        for name in ("file.json", "file.json.changes"):
+            try:
+                os.remove(name)
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+
+    def summary(self):
+        return [(e["seq"], e["op"], e["key"], sorted(e["fields"])) for e in self.events]
+
+    def test_create_update_delete(self):
+        pl = Place()
+        us = User()
+        self.storage.save()
+        pl.name = "Loft"
+        pl.max_guest = 3
+        self.storage.delete(us)
+        self.storage.save()
+        self.assertEqual([
+            (1, "create", "Place." + pl.id, ["__class__", "created_at", "id", "updated_at"]),
+            (2, "create", "User." + us.id, ["__class__", "created_at", "id", "updated_at"]),
+            (3, "update", "Place." + pl.id, ["max_guest", "name"]),
+            (4, "delete", "User." + us.id, [])], self.summary())
+        self.assertEqual({"max_guest": 3, "name": "Loft"}, self.events[2]["fields"])
+
+    def test_changes_are_merged(self):
+        pl = Place()
+        pl.name = "Loft"
+        self.storage.save()
+        pl.save()
+        pl.save()
+        self.assertEqual(["create", "update", "update"], [e["op"] for e in self.events])
+        self.assertEqual("Loft", self.events[0]["fields"]["name"])
+        self.assertEqual(pl.to_dict(), self.events[2]["fields"])
+
+    def test_new_on_stored_object_lists_every_field(self):
+        pl = Place()
+        pl.amenity_ids = []
+        self.storage.save()
+        pl.amenity_ids.append("a1")
+        self.storage.new(pl)
+        self.storage.save()
+        self.assertEqual(["a1"], self.events[1]["fields"]["amenity_ids"])
+        self.assertEqual(pl.to_dict(), self.events[1]["fields"])
+
+    def test_touch_without_name(self):
+        pl = Place()
+        self.storage.save()
+        self.storage.touch(pl)
+        self.storage.save()
+        self.assertEqual(pl.to_dict(), self.events[1]["fields"])
+
+    def test_failed_save_publishes_after_retry(self):
+        pl = Place()
+        with patch("os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.storage.save()
+        self.assertEqual([], self.events)
+        self.storage.save()
+        self.assertEqual([(1, "create", "Place." + pl.id)],
+                         [event[:3] for event in self.summary()])
+
+    def test_background_publishes_after_write(self):
+        with patch("atexit.register"):
+            storage = FileStorage(background=True)
+        written = []
+
+        def check(event):
+            with open("file.json", "r") as f:
+                written.append(event["key"] in json.load(f))
+        storage.subscribe(check)
+        with patch("models.base_model.storage", storage):
+            Place()
+            storage.save()
+            Place()
+            storage.save()
+        storage.close()
+        self.assertEqual([True, True], written)
+
+    def test_no_events_without_changes(self):
+        self.storage.save()
+        self.assertEqual([], self.events)
+
+    def test_changelog(self):
+        pl = Place()
+        self.storage.save()
+        pl.name = "Loft"
+        self.storage.save()
+        self.assertEqual(self.events, self.storage.events())
+        self.assertEqual(self.events[1:], self.storage.events(1))
+        with open("file.json.changes", "a") as f:
+            f.write('{"seq": 3, "op"')
+        self.assertEqual(self.events, self.storage.events())
+
+    def test_sequence_carries_on(self):
+        Place()
+        self.storage.save()
+        storage = FileStorage(changelog=True)
+        storage.reload()
+        with patch("models.base_model.storage", storage):
+            Place()
+        storage.save()
+        self.assertEqual([1, 2], [e["seq"] for e in storage.events()])
+
+    def test_reload_drops_changes(self):
+        Place()
+        self.storage.reload()
+        self.storage.save()
+        self.assertEqual([], self.events)
+
+    def test_unsubscribe(self):
+        self.storage.unsubscribe(self.events.append)
+        Place()
+        self.storage.save()
+        self.assertEqual([], self.events)
+        self.assertEqual(1, len(self.storage.events()))
+
+
+class TestFileStorage_shared(unittest.TestCase):
+    """Unittests for testing FileStorage files shared between processes."""
+
+    def setUp(self):
+        self.storage = FileStorage(shared=True)
+        patcher = patch("models.base_model.storage", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pl = Place()
+        self.us = User()
+        self.storage.save()
+
+    def tearDown(self):
+        for name in os.listdir("."):
+            if name.startswith("file."):
+                os.remove(name)
+        FileStorage._FileStorage__objects = {}
+
+    def rewrite(self, path, change):
+        """Rewrites a JSON file as another process would."""
+        with open(path, "r") as f:
+            objects = json.load(f)
+        change(objects)
+        with open(path + ".tmp", "w") as f:
+            json.dump(objects, f)
+        os.replace(path + ".tmp", path)
+
+    def test_invalid_modes(self):
+        with self.assertRaises(ValueError):
+            FileStorage(shared=True, background=True)
+        with self.assertRaises(ValueError):
+            FileStorage(shared=True, lazy=True)
+
+    def test_refresh(self):
+        other = dict(self.pl.to_dict(), id="other")
+
+        def change(objects):
+            objects["Place." + other["id"]] = other
+            objects["User." + self.us.id]["first_name"] = "Betty"
+            del objects["Place." + self.pl.id]
+        self.rewrite("file.json", change)
+        self.assertTrue(self.storage.refresh())
+        self.assertFalse(self.storage.refresh())
+        self.assertEqual("Betty", self.storage.get(User, self.us.id).first_name)
+        self.assertIsNone(self.storage.get(Place, self.pl.id))
+        self.assertEqual(other["id"], self.storage.get(Place, other["id"]).id)
+
+    def test_unchanged_objects_are_kept(self):
+        storage = FileStorage(shared=True, shards="class")
+        storage.save()
+        self.rewrite("file.Place.json", lambda objects: None)
+        self.assertTrue(storage.refresh())
+        self.assertIs(self.pl, storage.get(Place, self.pl.id))
+
+    def test_save_merges(self):
+        self.pl.name = "Loft"
+
+        def change(objects):
+            objects["Place." + self.pl.id]["name"] = "Barn"
+            objects["User." + self.us.id]["first_name"] = "Betty"
+        self.rewrite("file.json", change)
+        self.storage.save()
+        with open("file.json", "r") as f:
+            objects = json.load(f)
+        self.assertEqual("Loft", objects["Place." + self.pl.id]["name"])
+        self.assertEqual("Betty", objects["User." + self.us.id]["first_name"])
+
+    def test_journal_tail(self):
+        storage = FileStorage(shared=True, journal=True)
+        storage.reload()
+        self.us.first_name = "Betty"
+        storage.touch(self.us)
+        storage.save()
+        FileStorage._FileStorage__objects["User." + self.us.id].first_name = "Old"
+        with open("file.json.journal", "a") as f:
+            f.write(json.dumps({"key": "Place." + self.pl.id, "value": None}) + "\n")
+        with patch.object(storage, "_FileStorage__load") as load:
+            self.assertTrue(storage.refresh())
+        load.assert_not_called()
+        self.assertIsNone(storage.get(Place, self.pl.id))
+        self.assertEqual("Old", storage.get(User, self.us.id).first_name)
+
+    def test_changed_shards_only(self):
+        storage = FileStorage(shared=True, shards="class")
+        storage.save()
+        storage.reload()
+
+        def change(objects):
+            objects["User." + self.us.id]["first_name"] = "Betty"
+        self.rewrite("file.User.json", change)
+        with patch.object(storage, "_FileStorage__load",
+                          wraps=storage._FileStorage__load) as load:
+            self.assertTrue(storage.refresh())
+        self.assertEqual(["file.User.json"], [c.args[0] for c in load.call_args_list])
+        self.assertEqual("Betty", storage.get(User, self.us.id).first_name)
+        self.assertEqual(1, storage.count(Place))
+
+    @unittest.skipIf(fcntl is None, "advisory locks are POSIX only")
+    def test_save_holds_lock(self):
+        def save():
+            with open("file.json.lock", "a") as f:
+                with self.assertRaises(BlockingIOError):
+                    fcntl.flock(f, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        with patch.object(self.storage, "_FileStorage__snapshot_job",
+                          return_value=(save, frozenset())):
+            self.pl.save()
+
+    @unittest.skipIf(fcntl is None, "advisory locks are POSIX only")
+    def test_changelog_sequence_across_processes(self):
+        def save(count):
+            storage = FileStorage(shared=True, changelog=True)
+            with patch("models.base_model.storage", storage):
+                for _ in range(count):
+                    Place()
+                    storage.save()
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=save, args=(50,)) for _ in range(2)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        events = FileStorage(changelog=True).events()
+        self.assertEqual(list(range(1, 101)), [e["seq"] for e in events])
+
+    def test_unshared_refresh(self):
+        self.rewrite("file.json", lambda objects: objects.clear())
+        self.assertFalse(FileStorage().refresh())
+
+
 if __name__ == "__main__":
     unittest.main()
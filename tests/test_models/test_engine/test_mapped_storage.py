@@ -0,0 +1,155 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/mapped_storage.py.
+
+Unittest classes:
+    TestMappedSnapshot
+    TestMappedStorage
+"""
+import json
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import models
+import unittest
+from unittest.mock import patch
+from models.user import User
+from models.place import Place
+from models.engine import snapshot
+from models.engine.mapped_storage import MappedStorage
+
+
+class TestMappedSnapshot(unittest.TestCase):
+    """Unittests for testing the mapped snapshot format."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "file.map")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get_and_span(self):
+        items = [("User.{}".format(i), '{"n": %d}' % i) for i in range(50)]
+        items.append(("Place.1", "{}"))
+        snapshot.write_mapped(self.path, reversed(items))
+        mapped = snapshot.MappedSnapshot(self.path)
+        self.addCleanup(mapped.close)
+        self.assertEqual(51, len(mapped))
+        self.assertEqual(b'{"n": 7}', mapped.get("User.7"))
+        self.assertIsNone(mapped.get("User.70"))
+        self.assertEqual((1, 51), mapped.span("User."))
+        self.assertEqual([("Place.1", b"{}")], list(mapped.items(*mapped.span("Place."))))
+        self.assertEqual((0, 0), mapped.span("Amenity."))
+
+    def test_empty(self):
+        snapshot.write_mapped(self.path, [])
+        mapped = snapshot.MappedSnapshot(self.path)
+        self.addCleanup(mapped.close)
+        self.assertEqual(0, len(mapped))
+        self.assertIsNone(mapped.get("User.1"))
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"{}" * 16)
+        with self.assertRaises(ValueError):
+            snapshot.MappedSnapshot(self.path)
+
+    def test_convert_round_trip(self):
+        us = User()
+        us.first_name = "Betty"
+        objects = {"User." + us.id: us.to_dict()}
+        source = os.path.join(self.directory, "file.json")
+        copy = os.path.join(self.directory, "copy.json")
+        with open(source, "w") as f:
+            json.dump(objects, f)
+        snapshot.convert(source, self.path)
+        snapshot.convert(self.path, copy)
+        with open(copy) as f:
+            self.assertEqual(objects, json.load(f))
+
+
+class TestMappedStorage(unittest.TestCase):
+    """Unittests for testing the MappedStorage engine."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "file.map")
+        self.user = User()
+        self.user.first_name = "Betty"
+        self.places = [Place() for _ in range(3)]
+        objects = [self.user] + self.places
+        snapshot.write(self.path, {"{}.{}".format(type(obj).__name__, obj.id):
+                                   obj.to_dict() for obj in objects})
+        self.storage = MappedStorage(self.path)
+        self.storage.reload()
+        self.addCleanup(self.storage.close)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_get(self):
+        loaded = self.storage.get(User, self.user.id)
+        self.assertEqual(self.user.to_dict(), loaded.to_dict())
+        self.assertIs(loaded, self.storage.get("User", self.user.id))
+        self.assertIsNone(self.storage.get(User, "missing"))
+
+    def test_all_and_count(self):
+        self.assertEqual(4, self.storage.count())
+        self.assertEqual(3, self.storage.count(Place))
+        self.assertEqual(0, self.storage.count("State"))
+        places = self.storage.all(Place)
+        self.assertEqual({"Place." + pl.id for pl in self.places}, set(places))
+        self.assertIs(places["Place." + self.places[0].id],
+                      self.storage.all()["Place." + self.places[0].id])
+
+    def test_read_only(self):
+        with self.assertRaises(PermissionError):
+            self.storage.new(User())
+        with self.assertRaises(PermissionError):
+            self.storage.delete(self.storage.get(User, self.user.id))
+        with self.assertRaises(PermissionError):
+            self.storage.save()
+
+    def test_assignment_is_refused(self):
+        loaded = self.storage.get(User, self.user.id)
+        with patch("models.base_model.storage", self.storage):
+            with self.assertRaises(PermissionError):
+                loaded.first_name = "Holly"
+            with self.assertRaises(PermissionError):
+                loaded.last_name = "Golightly"
+        self.assertEqual("Betty", loaded.first_name)
+        self.assertNotIn("last_name", loaded.__dict__)
+
+    def test_missing_file_is_empty(self):
+        storage = MappedStorage(os.path.join(self.directory, "missing.map"))
+        storage.reload()
+        self.assertEqual({}, storage.all(User))
+        self.assertEqual(0, storage.count())
+        self.assertIsNone(storage.get(User, self.user.id))
+
+    def test_converter_under_mapped_storage(self):
+        source = os.path.join(self.directory, "file.json")
+        destination = os.path.join(self.directory, "new.map")
+        snapshot.convert(self.path, source)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(models.__file__)))
+        env = dict(os.environ, HBNB_TYPE_STORAGE="mapped",
+                   HBNB_FILE_PATH=destination, PYTHONPATH=root)
+        subprocess.run([sys.executable, "-W", "error", "-m", "models.engine.convert",
+                        source, destination], env=env, check=True, cwd=self.directory)
+        storage = MappedStorage(destination)
+        storage.reload()
+        self.addCleanup(storage.close)
+        self.assertEqual(4, storage.count())
+
+    def test_reload_forgets_objects(self):
+        loaded = self.storage.get(User, self.user.id)
+        generation = self.storage.generation()
+        self.storage.reload()
+        self.assertIsNot(loaded, self.storage.get(User, self.user.id))
+        self.assertNotEqual(generation, self.storage.generation())
+
+
+if __name__ == "__main__":
+    unittest.main()
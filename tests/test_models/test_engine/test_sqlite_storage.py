@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/sqlite_storage.py.
+
+Unittest classes:
+    TestSQLiteStorage
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from models.user import User
+from models.place import Place
+from models.base_model import BaseModel
+from models.engine.base_storage import BaseStorage
+from models.engine.file_storage import FileStorage
+from models.engine.sqlite_storage import SQLiteStorage
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    """Unittests for testing the SQLiteStorage engine."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "file.db")
+        self.storage = SQLiteStorage(self.path)
+        self.storage.reload()
+        patcher = patch("models.base_model.storage", self.storage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def reopen(self):
+        storage = SQLiteStorage(self.path)
+        storage.reload()
+        return storage
+
+    def test_engines_share_the_interface(self):
+        self.assertTrue(issubclass(SQLiteStorage, BaseStorage))
+        self.assertTrue(issubclass(FileStorage, BaseStorage))
+
+    def test_new_save_and_get(self):
+        pl = Place()
+        pl.name = "Loft"
+        pl.max_guest = 3
+        pl.amenity_ids = ["wifi"]
+        pl.pets = "dog"
+        pl.save()
+        loaded = self.reopen().get(Place, pl.id)
+        self.assertEqual(pl.to_dict(), loaded.to_dict())
+        self.assertEqual(pl.created_at, loaded.created_at)
+
+    def test_get_returns_same_instance(self):
+        us = User()
+        self.assertIs(us, self.storage.get("User", us.id))
+        self.assertIsNone(self.storage.get("User", "missing"))
+        self.assertIsNone(self.storage.get("Nothing", us.id))
+
+    def test_unsaved_changes_are_not_committed(self):
+        us = User()
+        self.assertEqual(0, self.reopen().count(User))
+        self.storage.save()
+        self.assertEqual(1, self.reopen().count(User))
+
+    def test_touch_updates_row(self):
+        us = User()
+        self.storage.save()
+        us.first_name = "Betty"
+        self.storage.save()
+        self.assertEqual("Betty", self.reopen().get(User, us.id).first_name)
+
+    def test_delete(self):
+        us = User()
+        self.storage.save()
+        self.storage.delete(us)
+        self.assertIsNone(self.storage.get(User, us.id))
+        self.storage.save()
+        self.assertEqual(0, self.reopen().count(User))
+
+    def test_all_and_count(self):
+        bm = BaseModel()
+        us = User()
+        self.storage.save()
+        storage = self.reopen()
+        self.assertEqual({"BaseModel." + bm.id, "User." + us.id}, set(storage.all()))
+        self.assertEqual(["User." + us.id], list(storage.all(User)))
+        self.assertEqual(2, storage.count())
+        self.assertEqual(1, storage.count("User"))
+        self.assertEqual({}, storage.all("Nothing"))
+
+    def test_lookup_scans(self):
+        pl = Place()
+        pl.user_id = "u1"
+        Place().user_id = "u2"
+        self.storage.save()
+        self.assertEqual(["Place." + pl.id],
+                         list(self.reopen().lookup(Place, "user_id", "u1")))
+
+    def test_page_sorts(self):
+        places = [Place() for _ in range(3)]
+        self.storage.save()
+        ids = sorted(pl.id for pl in places)
+        storage = self.reopen()
+        self.assertEqual(ids[1:], [pl.id for pl in storage.page(Place, 2, after=ids[0])])
+        self.assertEqual([places[2].id], [pl.id for pl in storage.page(
+            Place, after=places[1].id, order="created_at")])
+
+    def test_between_sorts(self):
+        places = [Place() for _ in range(3)]
+        places[0].updated_at = datetime(2020, 1, 1)
+        self.storage.save()
+        found = self.reopen().between(Place, stop=datetime(2021, 1, 1))
+        self.assertEqual([places[0].id], [pl.id for pl in found])
+
+    def test_batch_commits_once(self):
+        with self.storage.batch():
+            for _ in range(3):
+                User().save()
+            self.assertEqual(0, self.reopen().count(User))
+        self.assertEqual(3, self.reopen().count(User))
+
+    def test_reload_drops_unsaved_changes(self):
+        User()
+        self.storage.reload()
+        self.assertEqual(0, self.storage.count())
+
+    def test_reload_adds_columns_of_new_attributes(self):
+        now = datetime.now().isoformat()
+        with sqlite3.connect(self.path) as connection:
+            connection.execute('DROP TABLE "Place"')
+            connection.execute('CREATE TABLE "Place" (id TEXT PRIMARY KEY, '
+                               'created_at TEXT, updated_at TEXT, extra TEXT)')
+            connection.execute('INSERT INTO "Place" VALUES (?, ?, ?, ?)',
+                               ("old", now, now, '{"name": "Loft"}'))
+        connection.close()
+        storage = self.reopen()
+        self.assertEqual("Loft", storage.get(Place, "old").name)
+        with patch("models.base_model.storage", storage):
+            pl = Place()
+            pl.max_guest = 3
+            pl.save()
+        self.assertEqual(3, self.reopen().get(Place, pl.id).max_guest)
+        self.assertEqual(2, self.reopen().count(Place))
+
+
+if __name__ == "__main__":
+    unittest.main()